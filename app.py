@@ -7,7 +7,7 @@ from firestore_auth import (login_form, logout, is_authenticated,
                            get_current_user, get_user_role_session,
                            show_all_users, create_user, verify_wheat_code,
                            show_password_change_form)
-from utils import initialize_firestore
+from utils import initialize_firestore, get_firestore_init_seconds
 from tutorial import show_tutorial
 
 def main():
@@ -70,6 +70,9 @@ def main():
         st.sidebar.subheader("🔧 管理員專用")
         st.sidebar.caption("🔒 三層驗證已啟用")
         st.sidebar.caption("🛡️ Firestore 認證")
+        init_seconds = get_firestore_init_seconds()
+        if init_seconds is not None:
+            st.sidebar.caption(f"⏱️ Firestore 初始化耗時 {init_seconds:.2f} 秒")
         
         # Admin can access user management through sidebar
         if st.sidebar.button("👥 查看所有使用者"):
@@ -0,0 +1,157 @@
+"""
+Benchmarks for the payroll engine and the Excel reader backends.
+
+Run with: python benchmark.py
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from excel_reader import available_backends, choose_backend
+from payroll_engine import compute_payroll, iter_time_record_rows
+from pos_engine import read_pos_subtotals
+
+
+def make_time_records(employees, days=31, seed=0):
+    """
+    Build a synthetic time record sheet and matching salary data.
+
+    Args:
+        employees: Number of employee blocks
+        days: Shifts per employee
+        seed: Random seed
+
+    Returns:
+        tuple: (time records DataFrame, salary DataFrame)
+    """
+    rng = random.Random(seed)
+    labels, stamps = [], []
+    for e in range(employees):
+        labels.append(f"員工{e}")
+        stamps.append(None)
+        for d in range(days):
+            start = datetime(2025, 4, 1, 8) + timedelta(days=d, minutes=rng.randint(0, 120))
+            end = start + timedelta(minutes=rng.randint(240, 13 * 60))
+            labels += ["上班", "下班"]
+            stamps += [f"{start:%Y-%m-%d %H:%M:%S}", f"{end:%Y-%m-%d %H:%M:%S}"]
+        labels.append("總時數")
+        stamps.append(None)
+
+    df = pd.DataFrame({"小麥過敏": labels, "打卡時間": stamps})
+    df_salary = pd.DataFrame({
+        "綽號": [f"員工{e}" for e in range(employees)],
+        "月薪": [30000.0] * employees,
+        "平均薪資": [125.0] * employees,
+    })
+    return df, df_salary
+
+
+def make_pos_export(days, items_per_day=40, seed=0):
+    """
+    Build a synthetic POS export: line items plus one 小結 row per day.
+
+    Args:
+        days: Number of days
+        items_per_day: Line items before each subtotal
+        seed: Random seed
+
+    Returns:
+        pd.DataFrame: Sheet1 content, columns A-E as in the POS export
+    """
+    rng = random.Random(seed)
+    rows = []
+    for d in range(days):
+        # Date cells as in the real export, so every backend has to type them
+        date = datetime(2022, 1, 1) + timedelta(days=d)
+        total = 0
+        for i in range(items_per_day):
+            amount = rng.randint(50, 500)
+            total += amount
+            rows.append(["門市", None, date, amount, f"品項{i}"])
+        rows.append([None, "小結", date, total, None])
+    return pd.DataFrame(rows, columns=["門市", None, "日期", "金額", "品項"])
+
+
+def _best_of(func, repeat=3):
+    """Return the fastest of repeat runs of func, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_parallel_payroll(sizes=(25, 50, 100, 200, 400, 800), workers=None):
+    """Compare the serial and process-pool payroll paths and report the crossover."""
+    workers = workers or max(2, os.cpu_count() or 1)
+    print(f"compute_payroll: serial vs {workers} workers")
+    print(f"{'employees':>10} {'serial (s)':>12} {'parallel (s)':>14}")
+
+    crossover = None
+    for size in sizes:
+        df, df_salary = make_time_records(size)
+        serial_records, _ = compute_payroll(df, df_salary)
+        parallel_records, _ = compute_payroll(df, df_salary, workers=workers, chunk_size=max(1, size // workers))
+        assert all(serial_records[name].equals(parallel_records[name]) for name in serial_records)
+
+        serial = _best_of(lambda: compute_payroll(df, df_salary))
+        parallel = _best_of(lambda: compute_payroll(df, df_salary, workers=workers,
+                                                    chunk_size=max(1, size // workers)))
+        print(f"{size:>10} {serial:>12.3f} {parallel:>14.3f}")
+        if crossover is None and parallel < serial:
+            crossover = size
+
+    if crossover is None:
+        print("The process pool was not faster at any size tried")
+    else:
+        print(f"The process pool wins from about {crossover} employees")
+
+
+def bench_excel_readers(time_record_sizes=(50, 200, 800), pos_days=(90, 365, 1460)):
+    """Time every available Excel reader backend on time record and POS layouts."""
+    backends = available_backends()
+    print(f"Excel readers: {', '.join(backends)}")
+    print(f"{'file':>24} {'size (KB)':>10} " + " ".join(f"{backend:>18}" for backend in backends) + f" {'auto':>18}")
+
+    def read_time_records(path, backend):
+        return list(iter_time_record_rows(path, backend=backend))
+
+    def read_pos(path, backend):
+        return read_pos_subtotals(path, backend=backend)
+
+    def same_values(first, other):
+        if isinstance(first, pd.DataFrame):
+            return first.equals(other) and list(first.dtypes) == list(other.dtypes)
+        return first == other
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = []
+        for size in time_record_sizes:
+            path = os.path.join(directory, f"time_records_{size}.xlsx")
+            make_time_records(size)[0].to_excel(path, index=False)
+            cases.append((f"time records x{size}", path, read_time_records))
+        for days in pos_days:
+            path = os.path.join(directory, f"pos_{days}.xlsx")
+            make_pos_export(days).to_excel(path, index=False, sheet_name="Sheet1")
+            cases.append((f"POS {days} days", path, read_pos))
+
+        for label, path, read in cases:
+            # Every backend must return the same values, not just as many rows
+            results = {backend: read(path, backend) for backend in backends}
+            baseline = results[backends[0]]
+            for backend, result in results.items():
+                assert same_values(baseline, result), f"{label}: {backend} disagrees with {backends[0]}"
+            timings = [_best_of(lambda: read(path, backend)) for backend in backends]
+            print(f"{label:>24} {os.path.getsize(path) / 1024:>10.0f} "
+                  + " ".join(f"{timing:>17.3f}s" for timing in timings)
+                  + f" {choose_backend(path, 'auto'):>18}")
+
+
+if __name__ == "__main__":
+    bench_parallel_payroll()
+    bench_excel_readers()
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Generated downloads (salary reports and bundles, POS workbooks) shared by every session on this server
+ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "forbro_artifacts"))
+ARTIFACT_CACHE_MB = int(os.environ.get("ARTIFACT_CACHE_MB", "512"))
+_artifact_cache = None
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of raw bytes (e.g. an uploaded file)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def frame_fingerprint(df):
+    """
+    Fingerprint the content of a DataFrame.
+
+    Args:
+        df: DataFrame to fingerprint
+
+    Returns:
+        str: SHA-256 hex digest of the column names and every value
+    """
+    digest = hashlib.sha256(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def records_fingerprint(records):
+    """
+    Fingerprint a dictionary of DataFrames (e.g. the employee records).
+
+    Args:
+        records: Dictionary with names as keys and DataFrames as values
+
+    Returns:
+        str: SHA-256 hex digest of the names, columns and every value
+    """
+    frames = {name: df for name, df in records.items() if not df.empty}
+    if not frames:
+        return hash_bytes(repr(list(records)).encode())
+    combined = pd.concat(frames, names=["__name__", None]).reset_index(level=0)
+    return frame_fingerprint(combined)
+
+
+def estimate_size(value):
+    """Estimate the memory held by a cached value, in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with LRU eviction by entry count and size.
+
+    Values are evicted least recently used first as soon as either the
+    number of entries or their estimated total size goes over its limit.
+    A value larger than max_bytes on its own is not stored.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key (marking it recently used), or default."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Store value under key, evicting old entries as needed."""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        """Estimated size of all cached values, in bytes."""
+        return self._total_bytes
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskLRUCache:
+    """
+    Directory of generated files with LRU eviction by total size.
+
+    Entries are files named after the SHA-256 of their key, so every
+    session and process of the server that uses the same directory shares
+    them. Reading an entry refreshes its modification time, and the least
+    recently used files are deleted once the directory grows past
+    max_bytes. Files are written to a temporary name and renamed into
+    place, so a reader never sees a half-written entry.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        """Path of the file that stores key."""
+        return os.path.join(self.directory, hash_bytes(repr(key).encode()) + self.suffix)
+
+    def get(self, key):
+        """Return the cached bytes for key (marking them recently used), or None."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def get_or_create(self, key, write):
+        """
+        Return the cached bytes for key, generating them on a miss.
+
+        Args:
+            key: Hashable description of the inputs
+            write: Callable that writes the file content to the binary
+                file object it is given
+
+        Returns:
+            bytes: The file content
+        """
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        path = self.path_for(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w+b") as f:
+                write(f)
+                f.seek(0)
+                data = f.read()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._evict()
+        return data
+
+    def _evict(self):
+        """Delete least recently used files until the directory fits max_bytes."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        """Delete every cached file."""
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+
+    @property
+    def total_bytes(self):
+        """Size of all cached files, in bytes."""
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.is_file() and not entry.name.endswith(".tmp"))
+
+    def __contains__(self, key):
+        return os.path.exists(self.path_for(key))
+
+
+def get_artifact_cache():
+    """Return the process-wide DiskLRUCache of generated downloads."""
+    global _artifact_cache
+    if _artifact_cache is None:
+        _artifact_cache = DiskLRUCache(ARTIFACT_CACHE_DIR, max_bytes=ARTIFACT_CACHE_MB * 1024 * 1024)
+    return _artifact_cache
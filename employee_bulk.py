@@ -0,0 +1,261 @@
+from datetime import datetime
+
+import pandas as pd
+
+# Firestore accepts at most 500 writes in one batch
+BATCH_LIMIT = 500
+
+# Headers accepted in an import sheet, mapped to the Employee fields
+IMPORT_COLUMNS = {
+    "綽號": "Nickname",
+    "全名": "Name",
+    "月薪": "Salary",
+    "平均薪資": "Hourly_Rate",
+    "備註": "Notes",
+}
+
+RESULT_OK = "成功"
+RESULT_SKIPPED = "略過"
+RESULT_FAILED = "失敗"
+
+
+def hourly_rate_for(salary):
+    """Default hourly rate of a monthly salary: salary ÷ 30 days ÷ 8 hours."""
+    return round(salary / 30 / 8, 2)
+
+
+def read_import_sheet(uploaded_file):
+    """
+    Read an employee import sheet.
+
+    Args:
+        uploaded_file: .csv or .xlsx file (path or file-like object with a name)
+
+    Returns:
+        pd.DataFrame: The sheet with Chinese or English headers normalized to
+        [Nickname, Name, Salary, Hourly_Rate, Notes] where present
+    """
+    name = getattr(uploaded_file, "name", str(uploaded_file))
+    if name.lower().endswith(".csv"):
+        sheet = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
+    else:
+        sheet = pd.read_excel(uploaded_file, dtype=str, keep_default_na=False)
+    sheet.columns = [str(column).strip() for column in sheet.columns]
+    return sheet.rename(columns=IMPORT_COLUMNS)
+
+
+def _report_row(row_number, nickname, result, detail=""):
+    return {"列": row_number, "綽號": nickname, "結果": result, "說明": detail}
+
+
+def validate_import_rows(sheet):
+    """
+    Turn an import sheet into Employee documents.
+
+    Nickname, Name and Salary are required. A missing Hourly_Rate is derived
+    from the salary with hourly_rate_for.
+
+    Args:
+        sheet: DataFrame returned by read_import_sheet
+
+    Returns:
+        tuple: (documents, report) where documents is a list of
+        (row_number, nickname, employee_data) and report lists the rejected rows
+    """
+    documents = []
+    report = []
+    missing = [column for column in ("Nickname", "Name", "Salary") if column not in sheet.columns]
+    if missing:
+        reverse = {field: header for header, field in IMPORT_COLUMNS.items()}
+        columns = "、".join(reverse[column] for column in missing)
+        return documents, [_report_row(0, "", RESULT_FAILED, f"缺少欄位: {columns}")]
+
+    seen = set()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Row numbers as shown in Excel: the header is row 1
+    for row_number, row in enumerate(sheet.to_dict("records"), start=2):
+        nickname = str(row.get("Nickname", "")).strip()
+        name = str(row.get("Name", "")).strip()
+        if not nickname and not name:
+            continue
+        if not nickname or not name:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, "員工綽號和全名為必填項"))
+            continue
+        if "/" in nickname:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, "綽號不可包含 '/'"))
+            continue
+        if nickname in seen:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, "綽號在檔案中重複"))
+            continue
+
+        try:
+            salary = float(str(row.get("Salary", "")).replace(",", ""))
+            hourly_text = str(row.get("Hourly_Rate", "")).replace(",", "").strip()
+            hourly_rate = float(hourly_text) if hourly_text else hourly_rate_for(salary)
+        except ValueError:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, "月薪或平均薪資不是數字"))
+            continue
+        if salary < 0 or hourly_rate < 0:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, "月薪和平均薪資不可為負數"))
+            continue
+
+        employee_data = {
+            "Name": name,
+            "Salary": salary,
+            "Hourly_Rate": hourly_rate,
+            "created_at": created_at,
+        }
+        notes = str(row.get("Notes", "")).strip()
+        if notes:
+            employee_data["Notes"] = notes
+        seen.add(nickname)
+        documents.append((row_number, nickname, employee_data))
+
+    return documents, report
+
+
+def commit_in_batches(db, writes):
+    """
+    Apply writes with one batched commit per BATCH_LIMIT documents.
+
+    Args:
+        db: Firestore client instance
+        writes: List of (key, apply) where apply(batch) stages one write
+
+    Returns:
+        dict: key -> error message for every write whose batch failed
+    """
+    errors = {}
+    for start in range(0, len(writes), BATCH_LIMIT):
+        chunk = writes[start:start + BATCH_LIMIT]
+        batch = db.batch()
+        for _, apply in chunk:
+            apply(batch)
+        try:
+            batch.commit()
+        except Exception as e:
+            print(f"Batch commit of {len(chunk)} writes failed: {e}")
+            for key, _ in chunk:
+                errors[key] = str(e)
+    return errors
+
+
+def import_employees(db, documents, overwrite=False):
+    """
+    Write imported employees with batched writes.
+
+    Existing employees are looked up in one batched read instead of one
+    get() per row. They are skipped, or merged into when overwrite is set
+    (created_at of an existing employee is kept).
+
+    Args:
+        db: Firestore client instance
+        documents: List of (row_number, nickname, employee_data) from validate_import_rows
+        overwrite: Update existing employees instead of skipping them
+
+    Returns:
+        tuple: (report, written) where report lists one result per row and
+        written maps nickname -> the fields written
+    """
+    collection = db.collection("Employee")
+    refs = [collection.document(nickname) for _, nickname, _ in documents]
+    existing = set()
+    if refs:
+        existing = {snapshot.id for snapshot in db.get_all(refs, field_paths=["Name"]) if snapshot.exists}
+
+    report = []
+    writes = []
+    staged = {}
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for (row_number, nickname, employee_data), ref in zip(documents, refs):
+        if nickname in existing:
+            if not overwrite:
+                report.append(_report_row(row_number, nickname, RESULT_SKIPPED, "員工已存在"))
+                continue
+            data = {key: value for key, value in employee_data.items() if key != "created_at"}
+            data["updated_at"] = updated_at
+            writes.append((row_number, lambda batch, ref=ref, data=data: batch.set(ref, data, merge=True)))
+            staged[row_number] = (nickname, data, "已更新")
+        else:
+            writes.append((row_number, lambda batch, ref=ref, data=employee_data: batch.set(ref, data)))
+            staged[row_number] = (nickname, employee_data, "已新增")
+
+    errors = commit_in_batches(db, writes)
+    written = {}
+    for row_number, (nickname, data, detail) in staged.items():
+        if row_number in errors:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, errors[row_number]))
+        else:
+            report.append(_report_row(row_number, nickname, RESULT_OK, detail))
+            written[nickname] = data
+
+    report.sort(key=lambda row: row["列"])
+    return report, written
+
+
+def plan_salary_adjustment(employee_df, percent, nicknames=None):
+    """
+    Compute new salaries for an adjustment by percent.
+
+    Salaries are rounded to whole dollars and the hourly rate is derived
+    from the new salary with hourly_rate_for.
+
+    Args:
+        employee_df: Employee table with columns [綽號, 全名, 月薪, 平均薪資]
+        percent: Adjustment in percent (3 for a 3% raise, -5 for a 5% cut)
+        nicknames: Employees to adjust (default: everyone)
+
+    Returns:
+        pd.DataFrame: Columns [綽號, 全名, 原月薪, 新月薪, 原平均薪資, 新平均薪資]
+    """
+    selected = employee_df
+    if nicknames is not None:
+        selected = employee_df[employee_df["綽號"].isin(nicknames)]
+    new_salary = (selected["月薪"].astype(float) * (1 + percent / 100)).round(0).clip(lower=0)
+    return pd.DataFrame({
+        "綽號": selected["綽號"].to_numpy(),
+        "全名": selected["全名"].to_numpy(),
+        "原月薪": selected["月薪"].to_numpy(),
+        "新月薪": new_salary.to_numpy(),
+        "原平均薪資": selected["平均薪資"].to_numpy(),
+        "新平均薪資": [hourly_rate_for(salary) for salary in new_salary],
+    })
+
+
+def apply_salary_adjustment(db, plan):
+    """
+    Write a salary adjustment plan with batched writes.
+
+    Args:
+        db: Firestore client instance
+        plan: DataFrame returned by plan_salary_adjustment
+
+    Returns:
+        tuple: (report, written) where report lists one result per employee
+        and written maps nickname -> the fields written
+    """
+    collection = db.collection("Employee")
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    writes = []
+    staged = {}
+    for row_number, row in enumerate(plan.to_dict("records"), start=1):
+        nickname = row["綽號"]
+        data = {
+            "Salary": float(row["新月薪"]),
+            "Hourly_Rate": float(row["新平均薪資"]),
+            "updated_at": updated_at,
+        }
+        ref = collection.document(nickname)
+        writes.append((row_number, lambda batch, ref=ref, data=data: batch.update(ref, data)))
+        staged[row_number] = (nickname, data, f"{row['原月薪']:,.0f} → {row['新月薪']:,.0f}")
+
+    errors = commit_in_batches(db, writes)
+    report = []
+    written = {}
+    for row_number, (nickname, data, detail) in staged.items():
+        if row_number in errors:
+            report.append(_report_row(row_number, nickname, RESULT_FAILED, errors[row_number]))
+        else:
+            report.append(_report_row(row_number, nickname, RESULT_OK, detail))
+            written[nickname] = data
+    return report, written
@@ -0,0 +1,250 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Columns of the employee table, as returned by utils.get_all_employees
+EMPLOYEE_COLUMNS = ["綽號", "全名", "月薪", "平均薪資"]
+
+# The only Employee fields the table needs; reads project onto these
+EMPLOYEE_FIELDS = ["Name", "Salary", "Hourly_Rate"]
+
+
+def build_employee_frame(nicknames, names, salaries, hourly_rates):
+    """
+    Build the typed employee table from column arrays.
+
+    Args:
+        nicknames: Document IDs (綽號)
+        names: Name fields
+        salaries: Salary fields (missing or non-numeric values become 0)
+        hourly_rates: Hourly_Rate fields (missing or non-numeric values become 0)
+
+    Returns:
+        pd.DataFrame: Employee data with string columns [綽號, 全名] and
+        float64 columns [月薪, 平均薪資]
+    """
+    return pd.DataFrame({
+        "綽號": pd.array(nicknames, dtype="string"),
+        "全名": pd.array(names, dtype="string").fillna(""),
+        "月薪": pd.to_numeric(pd.Series(salaries, dtype=object), errors="coerce").fillna(0).to_numpy(np.float64),
+        "平均薪資": pd.to_numeric(pd.Series(hourly_rates, dtype=object), errors="coerce").fillna(0).to_numpy(np.float64),
+    }, columns=EMPLOYEE_COLUMNS)
+
+
+def employee_frame_from_documents(documents):
+    """
+    Build the typed employee table from Employee document snapshots.
+
+    Args:
+        documents: Sequence of document snapshots (ideally projected onto EMPLOYEE_FIELDS)
+
+    Returns:
+        pd.DataFrame: Employee data with columns [綽號, 全名, 月薪, 平均薪資]
+    """
+    count = len(documents)
+    nicknames = np.empty(count, dtype=object)
+    names = np.empty(count, dtype=object)
+    salaries = np.empty(count, dtype=object)
+    hourly_rates = np.empty(count, dtype=object)
+    for position, document in enumerate(documents):
+        info = document.to_dict() or {}
+        nicknames[position] = document.id
+        names[position] = info.get("Name", "")
+        salaries[position] = info.get("Salary", 0)
+        hourly_rates[position] = info.get("Hourly_Rate", 0)
+    return build_employee_frame(nicknames, names, salaries, hourly_rates)
+
+
+class EmployeeIndex:
+    """
+    In-memory, nickname-keyed copy of the Employee collection.
+
+    A background on_snapshot listener applies every added, modified and
+    removed document as Firestore reports it, so reads never go to the
+    server. Writes made by this process are applied right away with
+    apply_write/apply_remove, since their change event may arrive after
+    the next rerun. Any object with an on_snapshot(callback) method can be
+    used as the collection, which lets a local fake drive the index by
+    calling the callback with its own change events.
+
+    Firestore only calls the listener when something changes, so a quiet
+    collection and a dead watch stream look the same from the callback;
+    is_healthy checks the stream itself and should be used before serving
+    the table.
+    """
+
+    def __init__(self, collection, clock=time.monotonic):
+        self._collection = collection
+        self._clock = clock
+        self._rows = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._last_snapshot_at = None
+        self._last_healthy_at = None
+        self._last_read_time = None
+        self.snapshot_count = 0
+
+    def start(self):
+        """Attach the snapshot listener (the first snapshot loads every document)."""
+        if self._watch is None:
+            self._watch = self._collection.on_snapshot(self._on_snapshot)
+        return self
+
+    def stop(self):
+        """Detach the snapshot listener."""
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the first snapshot arrived; returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    @property
+    def is_listening(self):
+        """True while the watch stream is up (started and not stopped or failed)."""
+        watch = self._watch
+        # Watch.is_active is False once the stream stopped without recovery;
+        # listeners without the attribute (local fakes) count as active
+        return watch is not None and bool(getattr(watch, "is_active", True))
+
+    @property
+    def is_healthy(self):
+        """True once the first snapshot arrived while the watch stream is still up."""
+        listening = self.is_listening
+        with self._lock:
+            if listening and self._ready.is_set():
+                self._last_healthy_at = self._clock()
+                return True
+        return False
+
+    def _on_snapshot(self, docs, changes, read_time):
+        """Listener callback: apply the document changes of one snapshot."""
+        with self._lock:
+            for change in changes:
+                document = change.document
+                if change.type.name == "REMOVED":
+                    self._rows.pop(document.id, None)
+                else:
+                    info = document.to_dict() or {}
+                    self._rows[document.id] = (
+                        info.get("Name", ""),
+                        info.get("Salary", 0),
+                        info.get("Hourly_Rate", 0),
+                    )
+            self._last_snapshot_at = self._last_healthy_at = self._clock()
+            self._last_read_time = read_time
+            self.snapshot_count += 1
+        self._ready.set()
+
+    def apply_write(self, nickname, employee_data):
+        """
+        Apply a successful add/update of an Employee document made by this process.
+
+        Args:
+            nickname: Document ID (綽號) of the employee
+            employee_data: Fields written to Firestore; fields not given keep their value
+        """
+        with self._lock:
+            name, salary, hourly_rate = self._rows.get(nickname, ("", 0, 0))
+            self._rows[nickname] = (
+                employee_data.get("Name", name),
+                employee_data.get("Salary", salary),
+                employee_data.get("Hourly_Rate", hourly_rate),
+            )
+
+    def apply_remove(self, nickname):
+        """Apply a successful delete of an Employee document made by this process."""
+        with self._lock:
+            self._rows.pop(nickname, None)
+
+    def get(self, nickname):
+        """Return (全名, 月薪, 平均薪資) of one employee, or None."""
+        with self._lock:
+            return self._rows.get(nickname)
+
+    def to_frame(self):
+        """Return the index as the employee table used by get_all_employees."""
+        with self._lock:
+            nicknames = list(self._rows)
+            values = list(self._rows.values())
+        names, salaries, hourly_rates = zip(*values) if values else ((), (), ())
+        return build_employee_frame(nicknames, names, salaries, hourly_rates)
+
+    def staleness_seconds(self):
+        """
+        How far behind the server the table may be, in seconds.
+
+        0 while the watch stream is up, since every change is delivered as
+        it happens; otherwise the time since the stream was last seen up.
+        None before the first snapshot.
+        """
+        if self.is_healthy:
+            return 0.0
+        with self._lock:
+            if self._last_healthy_at is None:
+                return None
+            return self._clock() - self._last_healthy_at
+
+    def seconds_since_last_change(self):
+        """Seconds since the listener last delivered a snapshot (None before the first one)."""
+        with self._lock:
+            if self._last_snapshot_at is None:
+                return None
+            return self._clock() - self._last_snapshot_at
+
+    @property
+    def last_read_time(self):
+        """Server read time of the last applied snapshot."""
+        return self._last_read_time
+
+
+_index_lock = threading.Lock()
+_index_state = {"index": None, "db": None}
+
+
+def get_employee_index(db, timeout=10):
+    """
+    Return the process-wide EmployeeIndex of db, starting its listener once.
+
+    A listener whose watch stream went down is replaced by a new one
+    without waiting for it, so the caller falls back to a normal read this
+    time and later calls get the restarted index.
+
+    Args:
+        db: Firestore client instance
+        timeout: Seconds to wait for the first snapshot of a new listener
+
+    Returns:
+        EmployeeIndex: The running index (check is_healthy before relying on it)
+    """
+    with _index_lock:
+        index = _index_state["index"]
+        if index is not None and _index_state["db"] is db:
+            if index.is_listening:
+                return index
+            print("Employee snapshot listener stopped, restarting it")
+            index.stop()
+            index = EmployeeIndex(db.collection("Employee").select(EMPLOYEE_FIELDS)).start()
+            _index_state["index"] = index
+            return index
+        if index is not None:
+            # The Firestore client was rebuilt; listen through the new one
+            index.stop()
+        index = EmployeeIndex(db.collection("Employee").select(EMPLOYEE_FIELDS)).start()
+        _index_state["index"] = index
+        _index_state["db"] = db
+    index.wait_until_ready(timeout)
+    return index
+
+
+def get_running_index():
+    """Return the process-wide EmployeeIndex if one was started, else None."""
+    return _index_state["index"]
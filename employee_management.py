@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils import initialize_firestore, get_all_employees
+from utils import initialize_firestore, get_all_employees, cache_employee_upsert, cache_employee_remove
+from employee_index import get_running_index
+from employee_bulk import (
+    read_import_sheet, validate_import_rows, import_employees,
+    plan_salary_adjustment, apply_salary_adjustment, RESULT_OK,
+)
 
 
 def display_employees(employee_df):
@@ -68,10 +73,11 @@ def add_employee(db):
             
             # Add employee to Firestore using the nickname as document name
             db.collection("Employee").document(nickname).set(employee_data)
-            st.success(f"員工 '{full_name}' (綽號: {nickname}) 已成功新增，請刷新頁面")
+            cache_employee_upsert(nickname, employee_data)
             
-            # Refresh the page to show updated data
-            # st.experimental_rerun()
+            # Rerun to show the updated data right away
+            st.session_state.employee_flash = f"員工 '{full_name}' (綽號: {nickname}) 已成功新增"
+            st.rerun()
         
         except Exception as e:
             st.error(f"新增員工時發生錯誤: {str(e)}")
@@ -149,10 +155,11 @@ def update_employee(db, employee_df):
                 notes):
                 # Update employee in Firestore
                 db.collection("Employee").document(selected_employee).update(updated_data)
-                st.success(f"員工 '{selected_employee}' 資料已成功更新，請刷新頁面")
+                cache_employee_upsert(selected_employee, updated_data)
                 
-                # Refresh the page to show updated data
-                # st.experimental_rerun()
+                # Rerun to show the updated data right away
+                st.session_state.employee_flash = f"員工 '{selected_employee}' 資料已成功更新"
+                st.rerun()
             else:
                 st.info("沒有資料被更改")
         
@@ -191,18 +198,94 @@ def delete_employee(db, employee_df):
                 try:
                     # Delete employee from Firestore
                     db.collection("Employee").document(selected_employee).delete()
-                    st.success(f"員工 '{selected_employee}' 已成功刪除，請刷新頁面")
+                    cache_employee_remove(selected_employee)
                     
-                    # Refresh the page to show updated data
-                    # st.experimental_rerun()
+                    # Rerun to show the updated data right away
+                    st.session_state.employee_flash = f"員工 '{selected_employee}' 已成功刪除"
+                    st.rerun()
                 
                 except Exception as e:
                     st.error(f"刪除員工時發生錯誤: {str(e)}")
 
+def _finish_bulk_write(report, written, action):
+    """Apply a bulk write to the cached table and keep its report across the rerun"""
+    for nickname, data in written.items():
+        cache_employee_upsert(nickname, data)
+    succeeded = sum(1 for row in report if row["結果"] == RESULT_OK)
+    st.session_state.employee_flash = f"{action}完成：{succeeded} / {len(report)} 筆成功"
+    st.session_state.employee_bulk_report = report
+    st.rerun()
+
+def bulk_import_employees(db):
+    """Import many employees from an Excel or CSV sheet"""
+    st.subheader("批次匯入員工")
+    st.caption("欄位：綽號、全名、月薪（必填），平均薪資、備註（選填）。未填平均薪資時以月薪÷30天÷8小時計算。")
+    
+    uploaded_file = st.file_uploader("上傳員工名單", type=['xlsx', 'csv'], key="bulk_import_file")
+    if uploaded_file is None:
+        return
+    
+    try:
+        sheet = read_import_sheet(uploaded_file)
+    except Exception as e:
+        st.error(f"讀取檔案時發生錯誤: {str(e)}")
+        return
+    
+    documents, rejected = validate_import_rows(sheet)
+    st.write(f"可匯入 {len(documents)} 筆，格式錯誤 {len(rejected)} 筆")
+    if rejected:
+        st.dataframe(pd.DataFrame(rejected), hide_index=True)
+    
+    overwrite = st.checkbox("覆寫已存在的員工資料", key="bulk_import_overwrite")
+    if documents and st.button("開始匯入", key="bulk_import_button"):
+        try:
+            with st.spinner("正在匯入員工資料..."):
+                report, written = import_employees(db, documents, overwrite=overwrite)
+        except Exception as e:
+            st.error(f"匯入員工資料時發生錯誤: {str(e)}")
+            return
+        _finish_bulk_write(sorted(rejected + report, key=lambda row: row["列"]), written, "批次匯入")
+
+def bulk_adjust_salaries(db, employee_df):
+    """Adjust the salary of many employees by a percentage"""
+    st.subheader("批次調薪")
+    
+    if employee_df is None or employee_df.empty:
+        st.warning("沒有員工資料可調整")
+        return
+    
+    all_nicknames = employee_df['綽號'].tolist()
+    selected = st.multiselect("選擇要調薪的員工", all_nicknames, default=all_nicknames, key="bulk_adjust_select")
+    percent = st.number_input("調整幅度 (%)", min_value=-100.0, value=3.0, step=0.5, key="bulk_adjust_percent")
+    st.caption("新月薪四捨五入至整數，平均薪資重新以新月薪÷30天÷8小時計算。")
+    
+    if not selected:
+        return
+    
+    plan = plan_salary_adjustment(employee_df, percent, selected)
+    st.dataframe(plan, hide_index=True)
+    
+    confirm = st.checkbox(f"我確認要調整 {len(plan)} 位員工的薪資", key="bulk_adjust_confirm")
+    if confirm and st.button("套用調薪", key="bulk_adjust_button"):
+        try:
+            with st.spinner("正在更新薪資..."):
+                report, written = apply_salary_adjustment(db, plan)
+        except Exception as e:
+            st.error(f"批次調薪時發生錯誤: {str(e)}")
+            return
+        _finish_bulk_write(report, written, "批次調薪")
+
 def run_employee_management():
     """Main function to run the employee management page"""
     st.title("員工管理")
     
+    # Result of the last add/update/delete, kept across the rerun it triggered
+    if "employee_flash" in st.session_state:
+        st.success(st.session_state.pop("employee_flash"))
+    if "employee_bulk_report" in st.session_state:
+        with st.expander("批次處理結果", expanded=True):
+            st.dataframe(pd.DataFrame(st.session_state.pop("employee_bulk_report")), hide_index=True)
+    
     # Initialize Firestore
     db = initialize_firestore()
     
@@ -213,10 +296,17 @@ def run_employee_management():
     # Fetch and display employee data
     st.subheader("員工資料")
     employee_df = get_all_employees(db)
+    
+    # State of the snapshot listener when it keeps the table in memory
+    index = get_running_index()
+    if index is not None and index.is_healthy:
+        st.caption("🔄 即時同步中")
+    elif index is not None and index.is_ready:
+        st.caption(f"⚠️ 即時同步已中斷 {index.staleness_seconds():.0f} 秒，暫時改為定期讀取資料庫")
     display_employees(employee_df)
     
     # Create tabs for different functions
-    tab1, tab2, tab3 = st.tabs(["新增員工", "更新員工資料", "刪除員工"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["新增員工", "更新員工資料", "刪除員工", "批次匯入", "批次調薪"])
     
     with tab1:
         add_employee(db)
@@ -226,6 +316,12 @@ def run_employee_management():
     
     with tab3:
         delete_employee(db, employee_df)
+    
+    with tab4:
+        bulk_import_employees(db)
+    
+    with tab5:
+        bulk_adjust_salaries(db, employee_df)
 
 if __name__ == "__main__":
     run_employee_management()
\ No newline at end of file
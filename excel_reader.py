@@ -0,0 +1,141 @@
+"""
+Row reader for uploaded .xlsx files with interchangeable backends.
+
+Backends:
+    openpyxl           openpyxl with the whole workbook loaded
+    openpyxl_readonly  openpyxl read-only mode, rows streamed from the XML
+    calamine           Rust calamine parser (python-calamine), when installed
+
+EXCEL_READER selects a backend for every read; the default "auto" picks
+one by file size (see choose_backend). Compare them with
+bench_excel_readers in benchmark.py. Every backend yields the same
+values: None for empty cells, int for whole numbers, datetime for dates.
+"""
+import os
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+READER_BACKENDS = ["openpyxl", "openpyxl_readonly", "calamine"]
+EXCEL_READER = os.environ.get("EXCEL_READER", "auto")
+
+# calamine holds the whole sheet in memory (about 15x the .xlsx size), so
+# larger files are streamed with openpyxl read-only mode instead
+EXCEL_CALAMINE_MAX_MB = int(os.environ.get("EXCEL_CALAMINE_MAX_MB", "16"))
+
+
+def available_backends():
+    """Return the backends that can be used in this environment."""
+    return [backend for backend in READER_BACKENDS if backend != "calamine" or CalamineWorkbook is not None]
+
+
+def source_size(source):
+    """Size in bytes of a path or a seekable file-like object."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer().nbytes
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def choose_backend(source, backend=None):
+    """
+    Pick the reader backend for a file.
+
+    An explicit backend (argument or EXCEL_READER) wins. Otherwise files up
+    to EXCEL_CALAMINE_MAX_MB are parsed by calamine when it is installed
+    (5-10x faster than openpyxl on our time record and POS layouts), and
+    everything else is streamed with openpyxl read-only mode, which beat
+    loading the whole workbook at every size benchmarked.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        backend: Backend name, "auto" or None (use EXCEL_READER)
+
+    Returns:
+        str: One of READER_BACKENDS
+    """
+    backend = backend or EXCEL_READER
+    if backend != "auto":
+        if backend not in READER_BACKENDS:
+            raise ValueError(f"Unknown Excel reader backend '{backend}', expected one of {READER_BACKENDS}")
+        if backend not in available_backends():
+            raise ValueError(f"Excel reader backend '{backend}' is not installed")
+        return backend
+
+    if CalamineWorkbook is not None and source_size(source) <= EXCEL_CALAMINE_MAX_MB * 1024 * 1024:
+        return "calamine"
+    return "openpyxl_readonly"
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _iter_openpyxl(source, sheet_name, max_col, read_only):
+    workbook = load_workbook(source, read_only=read_only, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(max_col=max_col, values_only=True)
+    finally:
+        workbook.close()
+
+
+def _calamine_value(value):
+    """Map calamine cell values onto what openpyxl returns."""
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    # calamine returns dates at midnight as date, openpyxl as datetime
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _iter_calamine(source, sheet_name, max_col):
+    if isinstance(source, (str, os.PathLike)):
+        workbook = CalamineWorkbook.from_path(os.fspath(source))
+    else:
+        workbook = CalamineWorkbook.from_filelike(source)
+    try:
+        worksheet = (workbook.get_sheet_by_name(sheet_name) if sheet_name is not None
+                     else workbook.get_sheet_by_index(0))
+        # skip_empty_area=False keeps the empty rows and columns before the
+        # first used cell, so column positions match openpyxl (A is index 0)
+        for row in worksheet.to_python(skip_empty_area=False):
+            if max_col is not None:
+                row = row[:max_col]
+            yield tuple(_calamine_value(value) for value in row)
+    finally:
+        workbook.close()
+
+
+def iter_rows(source, sheet_name=None, max_col=None, backend=None):
+    """
+    Iterate over the rows of one sheet as tuples of cell values.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        sheet_name: Sheet to read (default: the first sheet)
+        max_col: Only read the first max_col columns
+        backend: Backend name or "auto" (default: EXCEL_READER)
+
+    Yields:
+        tuple: Cell values of each row, starting with row 1
+    """
+    backend = choose_backend(source, backend)
+    _rewind(source)
+    if backend == "calamine":
+        yield from _iter_calamine(source, sheet_name, max_col)
+    else:
+        yield from _iter_openpyxl(source, sheet_name, max_col, read_only=backend == "openpyxl_readonly")
@@ -1,339 +1,177 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import math
+import os
 from datetime import datetime
-from io import BytesIO
 from utils import initialize_firestore, get_all_employees
+from cache import LRUCache, hash_bytes, frame_fingerprint, records_fingerprint, get_artifact_cache
+from salary_history import save_salary_history, get_year_to_date
+from payroll_engine import (compute_payroll_stream, read_time_records_head,
+                            format_employee_record, summarize_employee_records, write_payroll_workbook,
+                            write_payroll_bundle, merge_payroll_snapshots, diff_shifts, update_payroll_summary,
+                            DEFAULT_CHUNK_SIZE, PAYROLL_REPORT_VERSION)
 
+# Worker processes and employees per task for the payroll computation;
+# large multi-store files benefit from more workers
+PAYROLL_WORKERS = int(os.environ.get("PAYROLL_WORKERS", "1"))
+PAYROLL_CHUNK_SIZE = int(os.environ.get("PAYROLL_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
 
-def separate_employee_records(df, df_salary):
+# Parsed previews and computed payroll, keyed by the SHA-256 of the upload
+# (plus the salary table fingerprint) and shared by every session of the server
+PAYROLL_CACHE_ENTRIES = int(os.environ.get("PAYROLL_CACHE_ENTRIES", "16"))
+PAYROLL_CACHE_MB = int(os.environ.get("PAYROLL_CACHE_MB", "256"))
+_payroll_cache = LRUCache(max_entries=PAYROLL_CACHE_ENTRIES, max_bytes=PAYROLL_CACHE_MB * 1024 * 1024)
+
+
+def stream_employee_records(uploaded_file, df_salary, previous=None,
+                            workers=PAYROLL_WORKERS, chunk_size=PAYROLL_CHUNK_SIZE):
     """
-    Separate employee records and calculate overtime payments
+    Calculate overtime payments while the time record file is being read
     
     Parameters:
-    df: DataFrame containing the time records(Time_Record.xlsx)
-    df_salary: DataFrame containing employee salary information with columns ['綽號', '平均薪資'] from firestore
+    uploaded_file: Time record .xlsx file (path or file-like object)
+    df_salary: DataFrame containing employee salary information from firestore
+    previous: Snapshot of an earlier upload; employees whose shifts did not change are reused
+    workers: Number of worker processes used for the employee blocks (1 = no parallelism)
+    chunk_size: Number of employees handed to a worker at a time
     
     Returns:
-    dict: Dictionary with employee names as keys and their work records as DataFrames
+    tuple: (employee_records, messages, snapshot) - the typed records by employee name,
+    the (level, message) problems that were shown and the snapshot for the next upload
     """
-    
-    # Get all employee names
-    names = [i for i in df["小麥過敏"] if i not in ["上班", "下班", np.nan] and "總時數" not in str(i)]
-    
-    # Find all "總時數" rows once (outside the loop)
-    total_hours_mask = df["小麥過敏"].astype(str).str.contains("總時數")
-    total_hours_indices = df[total_hours_mask].index
-    
-    # Dictionary to store each employee's records
     employee_records = {}
+    all_messages = []
+    snapshots = []
+    progress = st.empty()
     
-    # Error handling for salary data
-    try:
-        employee_salary = df_salary.set_index('綽號')['月薪'].to_dict()
-        employee_hourly_rate = df_salary.set_index('綽號')['平均薪資'].to_dict()
-    except KeyError as e:
-        st.error(f"Error: Required column not found in salary data: {e}")
-        return {}
-    except Exception as e:
-        st.error(f"Error processing salary data: {e}")
-        return {}
-
-    for name in names:
-        # Check if employee exists in salary data
-        if name not in employee_salary or name not in employee_hourly_rate:
-            st.warning(f"Employee '{name}' not found in salary data. Skipping...")
-            continue
-            
-        try:
-            # Find the row index where this name appears
-            name_index = df[df["小麥過敏"] == name].index[0]
-        except IndexError:
-            st.warning(f"Employee '{name}' not found in time records. Skipping...")
-            continue
-        
-        # Find the first "總時數" row that comes after the name
-        end_index = None
-        for idx in total_hours_indices:
-            if idx > name_index:
-                end_index = idx
-                break
-        
-        # Extract all rows between name and "總時數" (or end of dataframe)
-        if end_index is not None:
-            raw_data = df.loc[name_index:end_index]
-        else:
-            raw_data = df.loc[name_index:]
-        
-        # Filter only the clock-in and clock-out rows
-        clock_rows = raw_data[raw_data["小麥過敏"].isin(["上班", "下班"])]
-        
-        salary = employee_salary[name]
-        hourly_rate = employee_hourly_rate[name]
-        
-        # Validate salary data
-        if not isinstance(salary, (int, float)) or salary <= 0:
-            st.warning(f"Invalid salary for '{name}': {salary}. Using 0.")
-            salary = 0
-        if not isinstance(hourly_rate, (int, float)) or hourly_rate <= 0:
-            st.warning(f"Invalid hourly rate for '{name}': {hourly_rate}. Using 0.")
-            hourly_rate = 0
-
-        # Prepare lists for the new dataframe
-        dates = []
-        clock_ins = []
-        clock_outs = []
-        work_hours = []
-        work_hours_formatted = []  
-        hours_8_10 = []
-        hours_10_12 = []
-        overtime_payment_8_10 = [] 
-        overtime_payment_10_12 = [] 
-        salary_column = []
-        hourly_rate_column = []
-        
-        # Process in pairs (上班/下班)
-        i = 0
-        while i < len(clock_rows) - 1:
-            if clock_rows.iloc[i]["小麥過敏"] == "上班" and clock_rows.iloc[i+1]["小麥過敏"] == "下班":
-                # Extract clock-in time details
-                timestamp_column = clock_rows.columns[1]
-                
-                # Get timestamps
-                clock_in_str = str(clock_rows.iloc[i][timestamp_column])
-                clock_out_str = str(clock_rows.iloc[i+1][timestamp_column])
-                
-                try:
-                    # Try to parse the date from clock-in timestamp
-                    if "-" in clock_in_str:
-                        date_format = "%Y-%m-%d"
-                        time_format = "%H:%M:%S"
-                    else:
-                        date_format = "%Y/%m/%d"
-                        time_format = "%H:%M"
-                    
-                    # Extract date and times
-                    date_part = clock_in_str.split()[0]
-                    clock_in_time = clock_in_str.split()[1] if len(clock_in_str.split()) > 1 else clock_in_str
-                    clock_out_time = clock_out_str.split()[1] if len(clock_out_str.split()) > 1 else clock_out_str
-                    
-                    try:
-                        # Parse the time strings
-                        clock_in_dt = datetime.strptime(date_part + " " + clock_in_time, date_format + " " + time_format)
-                        clock_out_dt = datetime.strptime(date_part + " " + clock_out_time, date_format + " " + time_format)
-                        
-                        # Check for overnight shifts (should not exist)
-                        if clock_out_dt < clock_in_dt:
-                            error_msg = (f"OVERNIGHT SHIFT DETECTED for employee '{name}' on {date_part}:\n"
-                                       f"Clock-in: {clock_in_time}\n"
-                                       f"Clock-out: {clock_out_time}\n"
-                                       f"This indicates a data error as overnight shifts should not exist.")
-                            st.error(error_msg)
-                            continue
-                        
-                        # Calculate work duration in hours
-                        work_duration_seconds = (clock_out_dt - clock_in_dt).total_seconds()
-                        work_duration_hours = work_duration_seconds / 3600
-
-                        if work_duration_hours < 0 or work_duration_hours > 24:
-                            st.warning(f"Unusual work duration for {name} on {date_part}: {work_duration_hours:.2f} hours")
-                        
-                        # Format work duration as hours and minutes
-                        hours = int(work_duration_hours)
-                        minutes = int((work_duration_hours - hours) * 60)
-                        work_duration_formatted = f"{hours} hours {minutes} min"
-                        
-                        # Calculate hours in 8-10 hour interval
-                        hours_in_8_10 = 0
-                        if work_duration_hours > 8:
-                            if work_duration_hours >= 10:
-                                hours_in_8_10 = 2
-                            else:
-                                hours_in_8_10 = work_duration_hours - 8
-                                
-                            # Round to nearest 0.2 hours (12 minutes)
-                            minutes_fraction = (hours_in_8_10 * 60) % 60
-                            hours_in_8_10 = int(hours_in_8_10) + (math.ceil(minutes_fraction / 12) * 0.2)
-                        
-                        # Calculate hours in 10-12 hour interval
-                        hours_in_10_12 = 0
-                        if work_duration_hours > 10:
-                            hours_in_10_12 = work_duration_hours - 10
-                                
-                            # Round to nearest 0.2 hours (12 minutes)
-                            minutes_fraction = (hours_in_10_12 * 60) % 60
-                            hours_in_10_12 = int(hours_in_10_12) + (math.ceil(minutes_fraction / 12) * 0.2)
-
-                        payment_8_10 = hours_in_8_10 * hourly_rate * 1.33
-                        payment_10_12 = hours_in_10_12 * hourly_rate * 1.67
-                        
-                        # Add to our records
-                        dates.append(date_part)
-                        clock_ins.append(clock_in_time)
-                        clock_outs.append(clock_out_time)
-                        work_hours.append(f"{work_duration_hours:.2f}")
-                        work_hours_formatted.append(work_duration_formatted)
-                        hours_8_10.append(f"{hours_in_8_10:.1f}")
-                        hours_10_12.append(f"{hours_in_10_12:.1f}")
-                        overtime_payment_8_10.append(f"{payment_8_10:.2f}")
-                        overtime_payment_10_12.append(f"{payment_10_12:.2f}")
+    for chunk_records, messages, snapshot in compute_payroll_stream(uploaded_file, df_salary,
+                                                                    workers=workers, chunk_size=chunk_size,
+                                                                    previous=previous):
+        show_payroll_messages(messages)
+        employee_records.update(chunk_records)
+        all_messages.extend(messages)
+        snapshots.append(snapshot)
+        progress.caption(f"已處理 {len(employee_records)} 位員工...")
+    
+    progress.empty()
+    return employee_records, all_messages, merge_payroll_snapshots(snapshots)
 
-                        if len(dates) == 1:  # First row
-                            salary_column.append(f"{salary:,.0f}")
-                            hourly_rate_column.append(f"{hourly_rate:.2f}")
-                        else:  # Subsequent rows
-                            salary_column.append("")
-                            hourly_rate_column.append("")
-                        
-                    except (ValueError, TypeError) as e:
-                        st.warning(f"Time parsing failed for {name} on {date_part}: {e}")
-                        # If time parsing fails, record strings without calculating hours
-                        dates.append(date_part)
-                        clock_ins.append(clock_in_time)
-                        clock_outs.append(clock_out_time)
-                        work_hours.append("N/A")
-                        work_hours_formatted.append("N/A")
-                        hours_8_10.append("N/A")
-                        hours_10_12.append("N/A")
-                        overtime_payment_8_10.append("N/A")
-                        overtime_payment_10_12.append("N/A")
-                                                
-                        if len(dates) == 1:  # First row
-                            salary_column.append(f"{salary:,.0f}")
-                            hourly_rate_column.append(f"{hourly_rate:.2f}")
-                        else:  # Subsequent rows
-                            salary_column.append("")
-                            hourly_rate_column.append("")
-                        
-                except (ValueError, TypeError, IndexError) as e:
-                    st.warning(f"Date parsing failed for {name}: {e}")
-                    # If date parsing fails, use raw strings
-                    dates.append("N/A")
-                    clock_ins.append(clock_in_str)
-                    clock_outs.append(clock_out_str)
-                    work_hours.append("N/A")
-                    work_hours_formatted.append("N/A")
-                    hours_8_10.append("N/A")
-                    hours_10_12.append("N/A")
-                    overtime_payment_8_10.append("N/A")
-                    overtime_payment_10_12.append("N/A")
+def show_shift_changes(diff, total):
+    """Show what changed since the previous upload of the same file"""
+    st.subheader('與上次上傳的差異')
+    if diff.empty:
+        st.info("班次沒有變更")
+        return
+    st.caption(f"{len(diff)} 個班次有變更，涉及 {diff['員工'].nunique()} / {total} 位員工")
+    st.dataframe(diff, hide_index=True)
 
-                    if len(dates) == 1:  # First row
-                        salary_column.append(f"{salary:,.0f}")
-                        hourly_rate_column.append(f"{hourly_rate:.2f}")
-                    else:  # Subsequent rows
-                        salary_column.append("")
-                        hourly_rate_column.append("")
-                
-                i += 2  # Move to the next pair
-            else:
-                i += 1  # Skip unpaired records
-        
-        # Only create DataFrame if we have data
-        if dates:
-            # Create the formatted dataframe
-            employee_df = pd.DataFrame({
-                "日期": dates,
-                "上班": clock_ins,
-                "下班": clock_outs,
-                "工作時數(小時)": work_hours,
-                "工作時間": work_hours_formatted,
-                "8-10小時區間": hours_8_10,
-                "10-12小時區間": hours_10_12,
-                "8-10小時加班費": overtime_payment_8_10,
-                "10-12小時加班費": overtime_payment_10_12,
-                "工資": salary_column,  
-                "平均薪資": hourly_rate_column  
-            })
-            
-            employee_records[name] = employee_df
+def show_payroll_messages(messages):
+    """Show the (level, message) problems returned by the payroll engine"""
+    for level, message in messages:
+        if level == "error":
+            st.error(message)
         else:
-            st.warning(f"No valid time records found for employee '{name}'")
-    
-    return employee_records
+            st.warning(message)
 
-def export_all_employees_to_excel(employee_records):
+def export_all_employees_to_excel(employee_records, summary=None):
     """
     Export all employee records to a single Excel file with multiple sheets
     
+    The workbook is stored in the on-disk artifact cache under a fingerprint
+    of the records, so reruns and other sessions downloading the same
+    results get the stored file instead of a new export. The returned bytes
+    are the only in-memory copy and can be handed to st.download_button as
+    they are.
+    
     Parameters:
-    employee_records: Dictionary with employee names as keys and DataFrames as values
+    employee_records: Dictionary with employee names as keys and typed DataFrames as values
+    summary: Summary table from summarize_employee_records (computed here when omitted)
     
     Returns:
-    BytesIO: Excel file buffer for download
+    bytes: The .xlsx file for download
     """
     if not employee_records:
         st.error("No employee records to export")
         return None
     
     try:
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            # Create a summary sheet
-            summary_data = []
-            for name, df in employee_records.items():
-                if not df.empty:
-                    # Calculate totals for each employee
-                    total_work_hours = 0
-                    total_8_10_payment = 0
-                    total_10_12_payment = 0
-                    
-                    for _, row in df.iterrows():
-                        if row['工作時數(小時)'] != "N/A" and row['工作時數(小時)'] != "":
-                            try:
-                                total_work_hours += float(row['工作時數(小時)'])
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if row['8-10小時加班費'] != "N/A" and row['8-10小時加班費'] != "":
-                            try:
-                                total_8_10_payment += float(row['8-10小時加班費'])
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if row['10-12小時加班費'] != "N/A" and row['10-12小時加班費'] != "":
-                            try:
-                                total_10_12_payment += float(row['10-12小時加班費'])
-                            except (ValueError, TypeError):
-                                pass
-                    
-                    # Get salary info from first row
-                    monthly_salary = df.iloc[0]['工資'] if not df.empty else ""
-                    hourly_rate = df.iloc[0]['平均薪資'] if not df.empty else ""
-                    
-                    summary_data.append({
-                        '員工綽號': name,
-                        '月薪': monthly_salary,
-                        '時薪': hourly_rate,
-                        '總工時': f"{total_work_hours:.2f}",
-                        '8-10小時加班費總計': f"{total_8_10_payment:.2f}",
-                        '10-12小時加班費總計': f"{total_10_12_payment:.2f}",
-                        '總加班費': f"{total_8_10_payment + total_10_12_payment:.2f}"
-                    })
-            
-            # Write summary sheet
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='薪資摘要', index=False)
-            
-            # Write individual employee sheets
-            for name, df in employee_records.items():
-                if not df.empty:
-                    # Clean sheet name (Excel has restrictions on sheet names)
-                    sheet_name = name[:31]  # Excel sheet name limit is 31 characters
-                    # Remove invalid characters
-                    invalid_chars = ['/', '\\', '?', '*', '[', ']', ':']
-                    for char in invalid_chars:
-                        sheet_name = sheet_name.replace(char, '_')
-                    
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-        
-        return buffer
+        key = ("payroll_workbook", PAYROLL_REPORT_VERSION, records_fingerprint(employee_records))
+        return get_artifact_cache().get_or_create(
+            key, lambda workbook_file: write_payroll_workbook(workbook_file, employee_records, summary)
+        )
     
     except Exception as e:
         st.error(f"Error creating Excel file: {e}")
         return None
 
+def export_employee_bundle(employee_records, summary=None, workers=PAYROLL_WORKERS):
+    """
+    Export one workbook per employee plus 薪資摘要.xlsx as a zip archive
+    
+    Uses the same sheet layout as export_all_employees_to_excel; the employee
+    workbooks are rendered on PAYROLL_WORKERS processes and the archive is
+    kept in the artifact cache like the single workbook.
+    
+    Parameters:
+    employee_records: Dictionary with employee names as keys and typed DataFrames as values
+    summary: Summary table from summarize_employee_records (computed here when omitted)
+    workers: Number of worker processes rendering the employee workbooks
+    
+    Returns:
+    bytes: The .zip file for download
+    """
+    if not employee_records:
+        st.error("No employee records to export")
+        return None
+    
+    try:
+        key = ("payroll_bundle", PAYROLL_REPORT_VERSION, records_fingerprint(employee_records))
+        with st.spinner('正在產生員工個別報表...'):
+            return get_artifact_cache().get_or_create(
+                key, lambda zip_file: write_payroll_bundle(zip_file, employee_records, summary, workers=workers)
+            )
+    
+    except Exception as e:
+        st.error(f"Error creating zip file: {e}")
+        return None
+
+def save_payroll_history(db, employee_records, source):
+    """Store the computed records in the salary history under a source label and report the result"""
+    try:
+        with st.spinner('正在儲存薪資歷史...'):
+            days, months, failed = save_salary_history(db, employee_records, source=source)
+    except ValueError as e:
+        st.warning(str(e))
+        return False
+    except Exception as e:
+        st.error(f"儲存薪資歷史時發生錯誤: {e}")
+        return False
+    
+    if failed:
+        st.error(f"薪資歷史有 {failed} 筆寫入失敗，請再試一次")
+        return False
+    st.success(f"已儲存 {days} 筆每日記錄和 {months} 筆月結記錄")
+    return True
+
+def show_year_to_date(db):
+    """Year-to-date hours and overtime pay, read from the monthly rollups"""
+    with st.expander('年度累計 (薪資歷史)'):
+        col1, col2 = st.columns(2)
+        with col1:
+            year = st.number_input('年份', min_value=2000, max_value=2100, value=datetime.now().year, step=1)
+        with col2:
+            through_month = st.number_input('統計至月份', min_value=1, max_value=12, value=12, step=1)
+        
+        if st.button('查詢年度累計'):
+            try:
+                ytd = get_year_to_date(db, year, through_month)
+            except Exception as e:
+                st.error(f"讀取薪資歷史時發生錯誤: {e}")
+                return
+            
+            if ytd.empty:
+                st.info(f"{year} 年尚無已儲存的薪資歷史")
+            else:
+                st.dataframe(ytd.round(2), hide_index=True)
+
 def run_salary_calculator():
     """Main function to run the salary calculator page"""
     st.title('員工薪資計算器')
@@ -357,76 +195,141 @@ def run_salary_calculator():
     
     # File upload for time records
     st.subheader('上傳打卡記錄')
-    uploaded_file = st.file_uploader('請上傳打卡記錄 Excel 檔案', type=['xlsx', 'xls'])
+    uploaded_file = st.file_uploader('請上傳打卡記錄 Excel 檔案', type=['xlsx'])
     
     if uploaded_file is not None:
         try:
-            # Read the time records file
-            df_time = pd.read_excel(uploaded_file)
+            # The same upload is only parsed and computed once, across reruns and sessions
+            file_hash = hash_bytes(uploaded_file.getvalue())
             
-            # Show preview of uploaded data
+            # Show preview of uploaded data (only the first rows are read)
             st.subheader('打卡記錄預覽')
-            st.dataframe(df_time.head())
+            preview = _payroll_cache.get(("preview", file_hash))
+            if preview is None:
+                preview = read_time_records_head(uploaded_file)
+                _payroll_cache.put(("preview", file_hash), preview)
+            st.dataframe(preview)
             
-            # Process button
+            # Process button; remember the request so reruns keep showing the results
+            payroll_key = ("payroll", file_hash, frame_fingerprint(df_salary))
             if st.button('處理薪資計算'):
-                with st.spinner('正在處理薪資計算...'):
-                    # Calculate salary records
-                    employee_records = separate_employee_records(df_time, df_salary)
+                st.session_state.payroll_key = payroll_key
+            
+            if st.session_state.get("payroll_key") == payroll_key:
+                # This session's previous upload of the same file, if any
+                previous = st.session_state.get("payroll_previous")
+                if previous is not None and previous["file_name"] != uploaded_file.name:
+                    previous = None
+                
+                cached = _payroll_cache.get(payroll_key)
+                if cached is None:
+                    with st.spinner('正在處理薪資計算...'):
+                        # Calculate salary records while streaming through the file; a re-upload
+                        # of the same file only recomputes the employees whose shifts changed
+                        employee_records, messages, snapshot = stream_employee_records(
+                            uploaded_file, df_salary, previous=previous and previous["snapshot"]
+                        )
+                        
+                        # Totals are computed once for the summary tab and the export
+                        if previous is None:
+                            summary = summarize_employee_records(employee_records)
+                        else:
+                            summary = update_payroll_summary(previous["summary"], employee_records,
+                                                             snapshot["recomputed"])
+                    _payroll_cache.put(payroll_key, (employee_records, summary, messages, snapshot))
+                else:
+                    employee_records, summary, messages, snapshot = cached
+                    show_payroll_messages(messages)
+                
+                # The cache is shared by all sessions, so the diff against this
+                # session's previous upload is kept in the session; reruns of the
+                # same request keep showing it
+                if previous is None:
+                    st.session_state.payroll_diff = None
+                elif previous["key"] != payroll_key:
+                    st.session_state.payroll_diff = diff_shifts(previous["snapshot"]["shifts"], snapshot["shifts"])
+                st.session_state.payroll_previous = {
+                    "key": payroll_key, "file_name": uploaded_file.name, "snapshot": snapshot, "summary": summary
+                }
+                diff = st.session_state.get("payroll_diff")
+                if diff is not None:
+                    show_shift_changes(diff, len(snapshot["digests"]))
+                
+                if employee_records:
+                    st.success(f"成功處理 {len(employee_records)} 位員工的薪資記錄")
                     
+                    # Display results in tabs
                     if employee_records:
-                        st.success(f"成功處理 {len(employee_records)} 位員工的薪資記錄")
+                        employee_names = list(employee_records.keys())
+                        tabs = st.tabs(['摘要'] + employee_names)
                         
-                        # Display results in tabs
-                        if employee_records:
-                            employee_names = list(employee_records.keys())
-                            tabs = st.tabs(['摘要'] + employee_names)
+                        # Summary tab
+                        with tabs[0]:
+                            st.subheader('薪資計算摘要')
                             
-                            # Summary tab
-                            with tabs[0]:
-                                st.subheader('薪資計算摘要')
+                            for name, work_days, total_8_10, total_10_12 in zip(
+                                summary['員工綽號'], summary['總工作天數'],
+                                summary['8-10小時加班費總計'], summary['10-12小時加班費總計']
+                            ):
+                                col1, col2, col3 = st.columns(3)
                                 
-                                for name, df in employee_records.items():
-                                    if not df.empty:
-                                        col1, col2, col3 = st.columns(3)
-                                        
-                                        with col1:
-                                            st.metric(f"{name} - 總工作天數", f"{len(df)} 天")
-                                        
-                                        # Calculate total overtime payments
-                                        total_8_10 = sum([float(x) for x in df['8-10小時加班費'] if x not in ['N/A', '']])
-                                        total_10_12 = sum([float(x) for x in df['10-12小時加班費'] if x not in ['N/A', '']])
-                                        
-                                        with col2:
-                                            st.metric(f"{name} - 8-10小時加班費", f"${total_8_10:.2f}")
-                                        
-                                        with col3:
-                                            st.metric(f"{name} - 10-12小時加班費", f"${total_10_12:.2f}")
-                                        
-                                        st.divider()
-                            
-                            # Individual employee tabs
-                            for i, (name, df) in enumerate(employee_records.items()):
-                                with tabs[i+1]:
-                                    st.subheader(f'{name} 的詳細薪資記錄')
-                                    st.dataframe(df)
-                        
-                        # Export all data
-                        st.subheader('匯出薪資報表')
-                        excel_buffer = export_all_employees_to_excel(employee_records)
+                                with col1:
+                                    st.metric(f"{name} - 總工作天數", f"{work_days} 天")
+                                
+                                with col2:
+                                    st.metric(f"{name} - 8-10小時加班費", f"${total_8_10:.2f}")
+                                
+                                with col3:
+                                    st.metric(f"{name} - 10-12小時加班費", f"${total_10_12:.2f}")
+                                
+                                st.divider()
                         
-                        if excel_buffer:
+                        # Individual employee tabs
+                        for i, (name, df) in enumerate(employee_records.items()):
+                            with tabs[i+1]:
+                                st.subheader(f'{name} 的詳細薪資記錄')
+                                st.dataframe(format_employee_record(df))
+                    
+                    # Export all data
+                    st.subheader('匯出薪資報表')
+                    export_mode = st.radio('匯出方式', ['單一活頁簿', '每位員工一個檔案 (zip)'], horizontal=True)
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+                    
+                    if export_mode == '單一活頁簿':
+                        excel_bytes = export_all_employees_to_excel(employee_records, summary)
+                        if excel_bytes:
                             st.download_button(
                                 label="下載完整薪資報表 (Excel)",
-                                data=excel_buffer.getvalue(),
-                                file_name=f"員工薪資報表_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                                data=excel_bytes,
+                                file_name=f"員工薪資報表_{timestamp}.xlsx",
                                 mime="application/vnd.ms-excel"
                             )
                     else:
-                        st.error("無法處理薪資資料。請檢查上傳的檔案格式和員工資料。")
-        
+                        zip_bytes = export_employee_bundle(employee_records, summary)
+                        if zip_bytes:
+                            st.download_button(
+                                label="下載員工個別薪資報表 (zip)",
+                                data=zip_bytes,
+                                file_name=f"員工薪資報表_{timestamp}.zip",
+                                mime="application/zip"
+                            )
+                    
+                    # Keep the month in Firestore; saving under the same source again replaces it
+                    st.subheader('薪資歷史')
+                    if st.session_state.get("history_saved_key") == payroll_key:
+                        st.caption('此檔案的薪資記錄已儲存至薪資歷史')
+                    source = st.text_input('來源名稱 (例如門市名稱)', key="history_source",
+                                           help='以相同來源名稱再次儲存會取代先前的記錄；不同門市請使用不同名稱')
+                    if st.button('儲存至薪資歷史', disabled=not source.strip()):
+                        if save_payroll_history(db, employee_records, source):
+                            st.session_state.history_saved_key = payroll_key
+                else:
+                    st.error("無法處理薪資資料。請檢查上傳的檔案格式和員工資料。")
+    
         except Exception as e:
             st.error(f"處理檔案時發生錯誤: {e}")
+    
+    show_year_to_date(db)
 
 if __name__ == "__main__":
     run_salary_calculator()
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Headless batch payroll for a directory of monthly time record files.
+
+Examples:
+    python payroll_cli.py time_records/ --salary salary.xlsx
+    python payroll_cli.py "2025/*.xlsx" --output reports --workers 4
+    python payroll_cli.py time_records/ --salary salary.csv --bundle
+
+Every file gets its own salary report in the output directory (or, with
+--bundle, a zip with one workbook per employee), plus one combined summary
+of all files. Without --salary the salary table is read
+from the Firestore Employee collection.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from payroll_engine import (compute_payroll_stream, summarize_employee_records, write_payroll_workbook,
+                            write_payroll_bundle)
+
+
+def find_time_record_files(patterns):
+    """
+    Expand directories and glob patterns into a sorted list of .xlsx files.
+
+    Args:
+        patterns: Directories, glob patterns or file paths
+
+    Returns:
+        list: Paths of the time record files
+    """
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.xlsx")
+        files.update(path for path in glob.glob(pattern) if path.endswith(".xlsx"))
+    # Skip Excel lock files such as "~$Time_Record.xlsx"
+    return sorted(path for path in files if not os.path.basename(path).startswith("~$"))
+
+
+def report_labels(files):
+    """
+    Give every input file a unique label for its report and summary rows.
+
+    The label is the path relative to the deepest directory holding all
+    inputs, so 2024/04.xlsx and 2025/04.xlsx stay apart.
+
+    Args:
+        files: Paths returned by find_time_record_files
+
+    Returns:
+        dict: path -> (label, report name), the report name being the label
+        without extension and with path separators replaced by "_"
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    labels = {}
+    taken = set()
+    for path in files:
+        label = os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+        name = os.path.splitext(label)[0].replace("/", "_")
+        candidate, suffix = name, 2
+        while candidate in taken:
+            candidate, suffix = f"{name}_{suffix}", suffix + 1
+        taken.add(candidate)
+        labels[path] = (label, candidate)
+    return labels
+
+
+def load_salary_table(salary_path=None):
+    """
+    Load the salary table once for the whole batch.
+
+    Args:
+        salary_path: .xlsx or .csv file with columns [綽號, 月薪, 平均薪資];
+            the Firestore Employee collection is used when omitted
+
+    Returns:
+        pd.DataFrame: Salary data with columns [綽號, 全名, 月薪, 平均薪資]
+    """
+    if salary_path:
+        if salary_path.endswith(".csv"):
+            return pd.read_csv(salary_path)
+        return pd.read_excel(salary_path)
+
+    # Only needed for Firestore, which reads its credentials through Streamlit secrets
+    from utils import initialize_firestore, get_all_employees
+    return get_all_employees(initialize_firestore())
+
+
+def process_file(path, df_salary, output_dir, bundle=False, report_name=None):
+    """
+    Compute the payroll of one time record file and write its report.
+
+    Args:
+        path: Time record .xlsx file
+        df_salary: Salary table
+        output_dir: Directory for the report
+        bundle: Write a zip with one workbook per employee instead of one workbook
+        report_name: Unique name of the report (see report_labels; default: the file name)
+
+    Returns:
+        dict: path, report path, summary table, messages and elapsed seconds
+    """
+    start = time.perf_counter()
+    employee_records = {}
+    messages = []
+    for chunk_records, chunk_messages, _ in compute_payroll_stream(path, df_salary):
+        employee_records.update(chunk_records)
+        messages.extend(chunk_messages)
+
+    report_path = None
+    summary = summarize_employee_records(employee_records)
+    if employee_records:
+        name = report_name or os.path.splitext(os.path.basename(path))[0]
+        if bundle:
+            report_path = os.path.join(output_dir, f"員工薪資報表_{name}.zip")
+            write_payroll_bundle(report_path, employee_records, summary)
+        else:
+            report_path = os.path.join(output_dir, f"員工薪資報表_{name}.xlsx")
+            write_payroll_workbook(report_path, employee_records, summary)
+
+    return {
+        "path": path,
+        "report_path": report_path,
+        "summary": summary,
+        "messages": messages,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch payroll for monthly time record files")
+    parser.add_argument("inputs", nargs="+", help="Directories, glob patterns or .xlsx files")
+    parser.add_argument("-s", "--salary", help="Salary table (.xlsx/.csv); default: Firestore")
+    parser.add_argument("-o", "--output", default="payroll_reports", help="Output directory")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Files computed at the same time")
+    parser.add_argument("-b", "--bundle", action="store_true",
+                        help="Write a zip with one workbook per employee for every file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every warning")
+    args = parser.parse_args(argv)
+
+    files = find_time_record_files(args.inputs)
+    if not files:
+        print("No .xlsx files found")
+        return 1
+
+    start = time.perf_counter()
+    df_salary = load_salary_table(args.salary)
+    if df_salary.empty:
+        print("Salary table is empty")
+        return 1
+    print(f"Loaded {len(df_salary)} employees in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(args.output, exist_ok=True)
+    labels = report_labels(files)
+    summaries = []
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(process_file, path, df_salary, args.output, args.bundle, labels[path][1]): path
+                   for path in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(files)}] {path}: failed ({e})")
+                continue
+
+            print(f"[{done}/{len(files)}] {path}: {len(result['summary'])} employees, "
+                  f"{len(result['messages'])} warnings, {result['elapsed']:.2f}s")
+            if args.verbose:
+                for level, message in result["messages"]:
+                    print(f"    {level}: {message}")
+            if result["report_path"]:
+                summaries.append(result["summary"].assign(檔案=labels[path][0]))
+
+    if summaries:
+        combined = pd.concat(summaries, ignore_index=True)
+        combined = combined[["檔案"] + [column for column in combined.columns if column != "檔案"]]
+        combined_path = os.path.join(args.output, "薪資摘要總表.xlsx")
+        combined.sort_values("檔案", kind="stable").to_excel(combined_path, index=False)
+        print(f"Combined summary: {combined_path}")
+
+    print(f"Processed {len(files) - failed}/{len(files)} files in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
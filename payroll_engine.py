@@ -0,0 +1,1147 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from itertools import islice
+from excel_reader import iter_rows
+import xlsxwriter
+import zipfile
+
+# Column A of the time record sheet holds the markers below plus the
+# employee nickname that opens each block; column B holds the timestamps.
+LABEL_COLUMN = "小麥過敏"
+CLOCK_IN = "上班"
+CLOCK_OUT = "下班"
+TOTAL_HOURS = "總時數"
+
+# Overtime multipliers for the 8-10 and 10-12 hour bands
+OVERTIME_RATE_8_10 = 1.33
+OVERTIME_RATE_10_12 = 1.67
+
+# Layout version of the payroll workbook and bundle; it is part of every
+# artifact cache key, so bump it whenever the exported files change
+PAYROLL_REPORT_VERSION = 1
+
+# Values of the 狀態 column of an employee record
+STATUS_OK = "正常"
+STATUS_TIME_ERROR = "時間解析失敗"
+STATUS_DATE_ERROR = "日期解析失敗"
+STATUS_OVERNIGHT = "跨夜班次"
+
+# Timestamp layouts seen in time record exports, most common first
+TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M:%S"]
+FORMAT_SAMPLE_SIZE = 50
+
+# Employees handed to a worker process at a time when computing in parallel
+DEFAULT_CHUNK_SIZE = 25
+
+# Rows buffered before a streamed time record file is computed
+STREAM_CHUNK_ROWS = 5000
+
+
+def read_time_records_head(source, rows=5):
+    """
+    Read the first rows of a time record workbook without loading it all.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        rows: Number of data rows to read
+
+    Returns:
+        pd.DataFrame: The first rows, with the sheet header as columns
+    """
+    sheet_rows = iter_rows(source, backend="openpyxl_readonly")
+    try:
+        header = next(sheet_rows, ())
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        return pd.DataFrame(list(islice(sheet_rows, rows)), columns=columns or None)
+    finally:
+        sheet_rows.close()
+
+
+def iter_time_record_rows(source, backend=None):
+    """
+    Stream the rows of a time record workbook that matter for payroll.
+
+    The sheet is read one row at a time by the excel_reader backend
+    (EXCEL_READER, chosen by file size by default). Only rows with
+    something in the "小麥過敏" column (上班, 下班, nicknames and 總時數
+    rows) are yielded; blank rows never leave this generator.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        backend: excel_reader backend name (default: EXCEL_READER)
+
+    Yields:
+        tuple: (label, timestamp) cell values of each row
+    """
+    sheet_rows = iter_rows(source, backend=backend)
+    try:
+        header = list(next(sheet_rows, ()))
+        label_col = header.index(LABEL_COLUMN) if LABEL_COLUMN in header else 0
+        for row in sheet_rows:
+            label = row[label_col] if len(row) > label_col else None
+            if label is None:
+                continue
+            yield label, row[1] if len(row) > 1 else None
+    finally:
+        sheet_rows.close()
+
+
+def iter_time_record_chunks(rows, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Group streamed rows into time record frames of whole employee blocks.
+
+    A frame is cut right before a nickname row once chunk_rows rows are
+    buffered, so no block is split. Blocks of a nickname that was already
+    seen are dropped here, matching segment_employee_blocks which only
+    uses the first block of a nickname.
+
+    Args:
+        rows: Iterable of (label, timestamp) tuples from iter_time_record_rows
+        chunk_rows: Rows to buffer before a frame is cut
+
+    Yields:
+        pd.DataFrame: Time records with columns [小麥過敏, 打卡時間]
+    """
+    buffer = []
+    seen = set()
+    skipping = False
+    for label, stamp in rows:
+        is_total = TOTAL_HOURS in str(label)
+        if label not in (CLOCK_IN, CLOCK_OUT) and not is_total:
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=[LABEL_COLUMN, "打卡時間"])
+                buffer = []
+            skipping = label in seen
+            seen.add(label)
+        elif is_total and skipping:
+            # Keep the closing row so the rows after it stay outside any block
+            skipping = False
+        if not skipping:
+            buffer.append((label, stamp))
+    if buffer:
+        yield pd.DataFrame(buffer, columns=[LABEL_COLUMN, "打卡時間"])
+
+
+def segment_employee_blocks(labels):
+    """
+    Split the time records into employee blocks in a single pass.
+
+    A block starts at an employee nickname row and is closed by the next
+    "總時數" row (inclusive) or by the next nickname row. When a nickname
+    opens more than one block only its first block is indexed.
+
+    Args:
+        labels: Series holding the "小麥過敏" column of the time records
+
+    Returns:
+        tuple: (block_ids, block_index) where block_ids is a Series holding,
+        for every row, the nickname that opened its block (NaN outside of
+        any block), and block_index maps each nickname, in sheet order, to
+        the range of row positions of its block
+    """
+    values = labels.to_numpy(dtype=object)
+    is_clock = labels.isin([CLOCK_IN, CLOCK_OUT]).to_numpy()
+    is_total = labels.astype(str).str.contains(TOTAL_HOURS, regex=False).to_numpy()
+    is_name = labels.notna().to_numpy() & ~is_clock & ~is_total
+
+    # Number the blocks with a running count of boundary rows
+    boundary = is_name | is_total
+    boundary_pos = np.flatnonzero(boundary)
+    block_no = np.cumsum(boundary) - 1
+
+    opener_pos = np.full(len(values), -1)
+    inside = block_no >= 0
+    opener_pos[inside] = boundary_pos[block_no[inside]]
+    inside[inside] = is_name[opener_pos[inside]]
+
+    block_ids = np.full(len(values), np.nan, dtype=object)
+    block_ids[inside] = values[opener_pos[inside]]
+    closing = np.flatnonzero(is_total & np.append(False, inside[:-1]))
+    block_ids[closing] = block_ids[closing - 1]
+
+    # A block ends right before the next boundary, or on it for a "總時數" row
+    next_boundary = np.append(boundary_pos[1:], len(values))
+    stops = next_boundary + np.append(is_total[boundary_pos[1:]], False)
+    opens = is_name[boundary_pos]
+    starts = boundary_pos[opens]
+    stops = stops[opens]
+    first = ~pd.Series(values[starts]).duplicated().to_numpy()
+
+    block_index = {
+        name: range(start, stop)
+        for name, start, stop in zip(values[starts][first], starts[first], stops[first])
+    }
+    return pd.Series(block_ids, index=labels.index, name="員工"), block_index
+
+
+def pair_clock_rows(df, block_index=None):
+    """
+    Pair every adjacent "上班" -> "下班" row inside each employee block.
+
+    Unpaired rows (a "上班" without a following "下班", or a lone "下班")
+    are skipped, the same way the row-by-row scan did. All employees are
+    paired in one pass.
+
+    Args:
+        df: DataFrame containing the time records (Time_Record.xlsx)
+        block_index: Nickname to row range mapping from
+            segment_employee_blocks; computed from df when omitted
+
+    Returns:
+        pd.DataFrame: One row per shift with columns [員工, 上班, 下班],
+        holding the raw clock-in and clock-out timestamps in sheet order
+    """
+    labels = df[LABEL_COLUMN]
+    if block_index is None:
+        _, block_index = segment_employee_blocks(labels)
+
+    # Expand the row ranges into a block code for every row (-1 outside)
+    names = np.array(list(block_index), dtype=object)
+    starts = np.array([r.start for r in block_index.values()], dtype=np.int64)
+    lengths = np.array([len(r) for r in block_index.values()], dtype=np.int64)
+    codes = np.repeat(np.arange(len(names)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    row_block = np.full(len(labels), -1)
+    row_block[np.repeat(starts, lengths) + offsets] = codes
+
+    clock_mask = labels.isin([CLOCK_IN, CLOCK_OUT]).to_numpy() & (row_block >= 0)
+    clock_labels = labels.to_numpy(dtype=object)[clock_mask]
+    clock_blocks = row_block[clock_mask]
+    clock_times = df[df.columns[1]].to_numpy(dtype=object)[clock_mask]
+
+    # A pair starts on a "上班" whose next clock row is a "下班" of the same block
+    is_in = clock_labels == CLOCK_IN
+    is_out = clock_labels == CLOCK_OUT
+    starts = np.zeros(len(clock_labels), dtype=bool)
+    starts[:-1] = is_in[:-1] & is_out[1:] & (clock_blocks[:-1] == clock_blocks[1:])
+    start_pos = np.flatnonzero(starts)
+
+    return pd.DataFrame({
+        "員工": names[clock_blocks[start_pos]],
+        CLOCK_IN: clock_times[start_pos],
+        CLOCK_OUT: clock_times[start_pos + 1],
+    })
+
+
+def detect_timestamp_format(sample, formats=TIMESTAMP_FORMATS):
+    """
+    Pick the first format that parses every string of a sample.
+
+    Args:
+        sample: Series of timestamp strings
+        formats: Candidate strptime formats, tried in order
+
+    Returns:
+        str: The matching format, or None when no single format fits
+    """
+    for fmt in formats:
+        if pd.to_datetime(sample, format=fmt, errors="coerce").notna().all():
+            return fmt
+    return None
+
+
+def parse_timestamps(values, formats=TIMESTAMP_FORMATS):
+    """
+    Parse a whole column of clock timestamps at once.
+
+    Cells that are already datetimes (typed by openpyxl) are used as they
+    are. Text cells are parsed with one format sniffed from a sample;
+    cells that do not match it are retried with the other formats, so
+    files mixing layouts still parse.
+
+    Args:
+        values: Array-like of raw timestamp cells
+        formats: Candidate strptime formats for text cells
+
+    Returns:
+        pd.Series: datetime64 values, NaT where a cell could not be parsed
+    """
+    values = pd.Series(values, dtype=object).reset_index(drop=True)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    cell_types = values.map(type)
+
+    is_typed = cell_types.isin([datetime, pd.Timestamp]).to_numpy()
+    if is_typed.any():
+        parsed[is_typed] = pd.to_datetime(values[is_typed])
+
+    text = values[(cell_types == str).to_numpy()].str.strip()
+    if text.empty:
+        return parsed
+
+    detected = detect_timestamp_format(text.head(FORMAT_SAMPLE_SIZE), formats)
+    candidates = [detected] + [fmt for fmt in formats if fmt != detected] if detected else formats
+    for fmt in candidates:
+        attempt = pd.to_datetime(text, format=fmt, errors="coerce").dropna()
+        parsed[attempt.index] = attempt
+        text = text.drop(attempt.index)
+        if text.empty:
+            break
+    return parsed
+
+
+def parse_shifts(shift_pairs):
+    """
+    Turn raw clock-in/clock-out pairs into dated shifts with durations.
+
+    The work date comes from the clock-in timestamp and the clock-out time
+    is taken on that same date. Pairs whose clock-in cannot be parsed are
+    marked 日期解析失敗, pairs whose clock-out cannot be parsed 時間解析失敗,
+    and pairs clocking out before clocking in 跨夜班次.
+
+    Args:
+        shift_pairs: DataFrame returned by pair_clock_rows
+
+    Returns:
+        pd.DataFrame: Columns [員工, 日期, 上班, 下班, 工作時數(小時), 狀態],
+        aligned with shift_pairs
+    """
+    count = len(shift_pairs)
+    # Parse both columns together so the format is sniffed once per file
+    parsed = parse_timestamps(np.concatenate([
+        shift_pairs[CLOCK_IN].to_numpy(dtype=object),
+        shift_pairs[CLOCK_OUT].to_numpy(dtype=object),
+    ]))
+    clock_in = parsed.iloc[:count].reset_index(drop=True)
+    clock_out_raw = parsed.iloc[count:].reset_index(drop=True)
+
+    dates = clock_in.dt.normalize()
+    clock_out = dates + (clock_out_raw - clock_out_raw.dt.normalize())
+    work_hours = (clock_out - clock_in).dt.total_seconds() / 3600
+
+    status = pd.Series(STATUS_OK, index=clock_in.index, dtype=object)
+    status[clock_out < clock_in] = STATUS_OVERNIGHT
+    status[clock_out.isna()] = STATUS_TIME_ERROR
+    status[clock_in.isna()] = STATUS_DATE_ERROR
+
+    failed = (status != STATUS_OK).to_numpy()
+    clock_out[clock_in.isna()] = pd.NaT
+    work_hours[failed] = np.nan
+
+    # Keep the raw cells of unparsable pairs so they can be fixed by hand
+    unparsed = status.isin([STATUS_DATE_ERROR, STATUS_TIME_ERROR]).to_numpy()
+    if unparsed.any():
+        raw_in = shift_pairs[CLOCK_IN].to_numpy(dtype=object)[unparsed]
+        raw_out = shift_pairs[CLOCK_OUT].to_numpy(dtype=object)[unparsed]
+        status[unparsed] = [f"{s}: {i} / {o}" for s, i, o in zip(status[unparsed], raw_in, raw_out)]
+
+    return pd.DataFrame({
+        "員工": shift_pairs["員工"].to_numpy(dtype=object),
+        "日期": dates,
+        CLOCK_IN: clock_in,
+        CLOCK_OUT: clock_out,
+        "工作時數(小時)": work_hours,
+        "狀態": status,
+    })
+
+
+def round_up_to_12_minutes(hours):
+    """Round hours up to the next 0.2 hour (12 minute) step, element-wise."""
+    hours = np.asarray(hours, dtype=np.float64)
+    minutes_fraction = (hours * 60) % 60
+    return np.trunc(hours) + np.ceil(minutes_fraction / 12) * 0.2
+
+
+def overtime_bands(work_hours, hourly_rate):
+    """
+    Split shift durations into overtime bands and price them.
+
+    Time past 8 hours (up to 10) falls in the 8-10 band and time past 10
+    hours in the 10-12 band. Each band is rounded up to the next 12
+    minutes, then paid at 1.33 and 1.67 times the hourly rate.
+
+    Args:
+        work_hours: Array-like of shift durations in hours (NaN allowed)
+        hourly_rate: Hourly rate, either a scalar or one value per shift
+
+    Returns:
+        tuple: (hours_8_10, hours_10_12, payment_8_10, payment_10_12) as
+        float64 arrays; NaN durations give NaN in every output
+    """
+    hours = np.asarray(work_hours, dtype=np.float64)
+    rate = np.asarray(hourly_rate, dtype=np.float64)
+
+    hours_8_10 = round_up_to_12_minutes(np.where(hours > 8, np.minimum(hours, 10) - 8, 0.0))
+    hours_10_12 = round_up_to_12_minutes(np.where(hours > 10, hours - 10, 0.0))
+
+    missing = np.isnan(hours)
+    hours_8_10[missing] = np.nan
+    hours_10_12[missing] = np.nan
+
+    payment_8_10 = hours_8_10 * rate * OVERTIME_RATE_8_10
+    payment_10_12 = hours_10_12 * rate * OVERTIME_RATE_10_12
+    return hours_8_10, hours_10_12, payment_8_10, payment_10_12
+
+
+def build_employee_record(dates, clock_ins, clock_outs, work_hours, statuses, salary, hourly_rate):
+    """
+    Build the typed work record of one employee.
+
+    Shifts that could not be parsed carry NaT/NaN values and a status
+    explaining why. The monthly salary and hourly rate are only filled in
+    on the first row, like in the exported report.
+
+    Args:
+        dates: Work date of every shift
+        clock_ins: Clock-in datetime of every shift
+        clock_outs: Clock-out datetime of every shift
+        work_hours: Shift duration in hours
+        statuses: Parse status of every shift
+        salary: Monthly salary of the employee
+        hourly_rate: Hourly rate of the employee
+
+    Returns:
+        pd.DataFrame: datetime64 and float64 columns plus the 狀態 column
+    """
+    work_hours = np.asarray(work_hours, dtype=np.float64)
+    hours_8_10, hours_10_12, payment_8_10, payment_10_12 = overtime_bands(work_hours, hourly_rate)
+
+    salary_column = np.full(len(work_hours), np.nan)
+    hourly_rate_column = np.full(len(work_hours), np.nan)
+    salary_column[:1] = salary
+    hourly_rate_column[:1] = hourly_rate
+
+    return pd.DataFrame({
+        "日期": pd.to_datetime(np.asarray(dates)),
+        "上班": pd.to_datetime(np.asarray(clock_ins)),
+        "下班": pd.to_datetime(np.asarray(clock_outs)),
+        "工作時數(小時)": work_hours,
+        "8-10小時區間": hours_8_10,
+        "10-12小時區間": hours_10_12,
+        "8-10小時加班費": payment_8_10,
+        "10-12小時加班費": payment_10_12,
+        "工資": salary_column,
+        "平均薪資": hourly_rate_column,
+        "狀態": np.asarray(statuses, dtype=object),
+    })
+
+
+def compute_employee_record(name, employee_shifts, salary, hourly_rate):
+    """
+    Compute the work record of one employee from their parsed shifts.
+
+    Nothing is shown to the user here: problems are returned as
+    (level, message) tuples, level being "error" or "warning", so this
+    can run in a worker process.
+
+    Args:
+        name: Employee nickname
+        employee_shifts: The employee's rows of parse_shifts
+        salary: Monthly salary from the salary data
+        hourly_rate: Hourly rate from the salary data
+
+    Returns:
+        tuple: (record, messages) where record is the typed DataFrame from
+        build_employee_record, or None when no shift is left
+    """
+    messages = []
+
+    # Validate salary data
+    if not isinstance(salary, (int, float)) or salary <= 0:
+        messages.append(("warning", f"Invalid salary for '{name}': {salary}. Using 0."))
+        salary = 0
+    if not isinstance(hourly_rate, (int, float)) or hourly_rate <= 0:
+        messages.append(("warning", f"Invalid hourly rate for '{name}': {hourly_rate}. Using 0."))
+        hourly_rate = 0
+
+    if (employee_shifts["狀態"] != STATUS_OK).any():
+        # Overnight shifts should not exist; report them and leave them out
+        overnight = employee_shifts["狀態"] == STATUS_OVERNIGHT
+        for date, clock_in, clock_out in zip(employee_shifts.loc[overnight, "日期"],
+                                             employee_shifts.loc[overnight, CLOCK_IN],
+                                             employee_shifts.loc[overnight, CLOCK_OUT]):
+            messages.append(("error", f"OVERNIGHT SHIFT DETECTED for employee '{name}' on {date:%Y-%m-%d}:\n"
+                                      f"Clock-in: {clock_in:%H:%M:%S}\n"
+                                      f"Clock-out: {clock_out:%H:%M:%S}\n"
+                                      f"This indicates a data error as overnight shifts should not exist."))
+        employee_shifts = employee_shifts[~overnight]
+
+        # Shifts that could not be parsed are kept without hours
+        for status in employee_shifts.loc[employee_shifts["狀態"] != STATUS_OK, "狀態"]:
+            messages.append(("warning", f"{status} for {name}"))
+
+    if employee_shifts.empty:
+        messages.append(("warning", f"No valid time records found for employee '{name}'"))
+        return None, messages
+
+    record = build_employee_record(
+        employee_shifts["日期"], employee_shifts[CLOCK_IN], employee_shifts[CLOCK_OUT],
+        employee_shifts["工作時數(小時)"], employee_shifts["狀態"], salary, hourly_rate
+    )
+    return record, messages
+
+
+def _compute_chunk(jobs):
+    """Run compute_employee_record for a list of (name, shifts, salary, hourly_rate) jobs."""
+    return [(job[0],) + compute_employee_record(*job) for job in jobs]
+
+
+def shift_fingerprints(shifts):
+    """
+    Key and fingerprint every parsed shift.
+
+    A shift is keyed by (員工, 日期, 上班); shifts whose clock-in could not
+    be parsed are keyed by their raw cells instead, and repeated keys get a
+    running number. The fingerprint hashes everything the pay depends on,
+    so a fixed clock-out changes the fingerprint but not the key.
+
+    Args:
+        shifts: DataFrame returned by parse_shifts
+
+    Returns:
+        pd.DataFrame: shifts plus the columns [班次鍵, 指紋]
+    """
+    clock_in_text = shifts[CLOCK_IN].dt.strftime("%Y-%m-%d %H:%M:%S")
+    key = shifts["員工"].astype(str) + "|" + clock_in_text.fillna(shifts["狀態"].astype(str))
+    occurrence = key.groupby(key).cumcount()
+    key = key.where(occurrence == 0, key + "#" + occurrence.astype(str))
+
+    fingerprint = pd.util.hash_pandas_object(shifts[["員工", CLOCK_IN, CLOCK_OUT, "狀態"]], index=False)
+    return shifts.assign(班次鍵=key.to_numpy(), 指紋=fingerprint.to_numpy())
+
+
+def _employee_digest(fingerprints, salary, hourly_rate):
+    """Digest of one employee's shifts and pay rates; equal digests give equal records."""
+    digest = hashlib.sha256(np.ascontiguousarray(fingerprints, dtype=np.uint64).tobytes())
+    digest.update(repr((salary, hourly_rate)).encode())
+    return digest.hexdigest()
+
+
+def compute_payroll_incremental(df, df_salary, previous=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compute the work records, reusing the unchanged employees of a previous run.
+
+    Every employee's shifts and pay rates are digested; employees whose
+    digest matches the previous snapshot keep their previous record and
+    messages, and only the others are computed (on a process pool with
+    workers > 1, like compute_payroll).
+
+    Args:
+        df: DataFrame containing the time records (Time_Record.xlsx)
+        df_salary: Employee salary data with columns [綽號, 月薪, 平均薪資]
+        previous: Snapshot returned by an earlier call (None computes everything)
+        workers: Number of worker processes; 1 computes in this process
+        chunk_size: Number of employees sent to a worker at a time
+
+    Returns:
+        tuple: (employee_records, messages, snapshot) - the records and
+        messages as in compute_payroll, and a snapshot of this run with the
+        keys digests, records, messages, shifts (shift_fingerprints of every
+        shift) and recomputed (nicknames that were computed, in sheet order)
+    """
+    snapshot = {"digests": {}, "records": {}, "messages": {}, "shifts": None, "recomputed": []}
+    try:
+        employee_salary = df_salary.set_index("綽號")["月薪"].to_dict()
+        employee_hourly_rate = df_salary.set_index("綽號")["平均薪資"].to_dict()
+    except KeyError as e:
+        return {}, [("error", f"Error: Required column not found in salary data: {e}")], snapshot
+    except Exception as e:
+        return {}, [("error", f"Error processing salary data: {e}")], snapshot
+
+    # Split the sheet into employee blocks once; names are kept in sheet order
+    _, block_index = segment_employee_blocks(df[LABEL_COLUMN])
+
+    # Pair every 上班/下班 row of every employee in one pass and parse the timestamps once
+    shifts = shift_fingerprints(parse_shifts(pair_clock_rows(df, block_index)))
+    snapshot["shifts"] = shifts
+    shifts_by_name = {name: group for name, group in shifts.groupby("員工", sort=False)}
+    empty_shifts = shifts.iloc[0:0]
+    previous = previous or {"digests": {}, "records": {}, "messages": {}}
+
+    jobs = []
+    messages_by_name = {}
+    for name in block_index:
+        # Check if employee exists in salary data
+        if name not in employee_salary or name not in employee_hourly_rate:
+            messages_by_name[name] = [("warning", f"Employee '{name}' not found in salary data. Skipping...")]
+            continue
+        employee_shifts = shifts_by_name.get(name, empty_shifts)
+        digest = _employee_digest(employee_shifts["指紋"], employee_salary[name], employee_hourly_rate[name])
+        snapshot["digests"][name] = digest
+        if previous["digests"].get(name) == digest:
+            messages_by_name[name] = previous["messages"].get(name, [])
+            if name in previous["records"]:
+                snapshot["records"][name] = previous["records"][name]
+            continue
+        jobs.append((name, employee_shifts,
+                     employee_salary[name], employee_hourly_rate[name]))
+
+    if workers > 1 and len(jobs) > chunk_size:
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = [result for chunk in executor.map(_compute_chunk, chunks) for result in chunk]
+    else:
+        results = _compute_chunk(jobs)
+
+    for name, record, record_messages in results:
+        messages_by_name[name] = record_messages
+        if record is not None:
+            snapshot["records"][name] = record
+    snapshot["recomputed"] = [job[0] for job in jobs]
+    snapshot["messages"] = messages_by_name
+
+    # Records and messages in sheet order, whichever process computed the employee
+    employee_records = {name: snapshot["records"][name] for name in block_index if name in snapshot["records"]}
+    messages = [message for name in block_index for message in messages_by_name.get(name, [])]
+    return employee_records, messages, snapshot
+
+
+def compute_payroll(df, df_salary, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compute the work records of every employee in the time records.
+
+    The sheet is segmented, paired and parsed once; the employee blocks
+    are then independent and, with workers > 1, are computed in chunks on
+    a process pool. Both paths give the same records.
+
+    Args:
+        df: DataFrame containing the time records (Time_Record.xlsx)
+        df_salary: Employee salary data with columns [綽號, 月薪, 平均薪資]
+        workers: Number of worker processes; 1 computes in this process
+        chunk_size: Number of employees sent to a worker at a time
+
+    Returns:
+        tuple: (employee_records, messages) where employee_records maps
+        nicknames, in sheet order, to typed DataFrames and messages is a
+        list of (level, message) tuples for the user
+    """
+    employee_records, messages, _ = compute_payroll_incremental(df, df_salary, workers=workers,
+                                                                chunk_size=chunk_size)
+    return employee_records, messages
+
+
+def compute_payroll_stream(source, df_salary, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                           chunk_rows=STREAM_CHUNK_ROWS, previous=None):
+    """
+    Compute payroll while a time record workbook is still being read.
+
+    Only a chunk of rows is held in memory at a time, and the records of
+    each chunk are yielded as soon as it is computed.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        df_salary: Employee salary data with columns [綽號, 月薪, 平均薪資]
+        workers: Number of worker processes; 1 computes in this process
+        chunk_size: Number of employees sent to a worker at a time
+        chunk_rows: Rows read before a chunk is computed
+        previous: Snapshot of an earlier run whose unchanged employees are
+            reused (see compute_payroll_incremental)
+
+    Yields:
+        tuple: (employee_records, messages, snapshot) for each chunk, as
+        returned by compute_payroll_incremental; merge_payroll_snapshots
+        combines the chunk snapshots
+    """
+    for chunk in iter_time_record_chunks(iter_time_record_rows(source), chunk_rows):
+        yield compute_payroll_incremental(chunk, df_salary, previous=previous,
+                                          workers=workers, chunk_size=chunk_size)
+
+
+def merge_payroll_snapshots(snapshots):
+    """Combine the per-chunk snapshots of a streamed run into one."""
+    merged = {"digests": {}, "records": {}, "messages": {}, "shifts": None, "recomputed": []}
+    shifts = []
+    for snapshot in snapshots:
+        for key in ("digests", "records", "messages"):
+            merged[key].update(snapshot[key])
+        merged["recomputed"].extend(snapshot["recomputed"])
+        if snapshot["shifts"] is not None:
+            shifts.append(snapshot["shifts"])
+    if shifts:
+        merged["shifts"] = pd.concat(shifts, ignore_index=True)
+    return merged
+
+
+def diff_shifts(previous_shifts, current_shifts):
+    """
+    List the shifts that were added, removed or changed between two runs.
+
+    Args:
+        previous_shifts: shifts of the earlier snapshot (shift_fingerprints layout)
+        current_shifts: shifts of the new snapshot
+
+    Returns:
+        pd.DataFrame: Columns [員工, 日期, 變更, 原上班, 原下班, 原工時, 新上班,
+        新下班, 新工時], one row per changed shift, sorted by employee and date
+    """
+    columns = ["班次鍵", "員工", "日期", CLOCK_IN, CLOCK_OUT, "工作時數(小時)", "指紋"]
+    merged = previous_shifts[columns].merge(current_shifts[columns], on="班次鍵", how="outer",
+                                           suffixes=("_原", "_新"), indicator=True)
+    changed = merged["_merge"] != "both"
+    changed |= (merged["_merge"] == "both") & (merged["指紋_原"] != merged["指紋_新"])
+    merged = merged[changed]
+
+    change = merged["_merge"].map({"left_only": "刪除", "right_only": "新增", "both": "修改"}).astype(object)
+    diff = pd.DataFrame({
+        "員工": merged["員工_新"].fillna(merged["員工_原"]),
+        "日期": merged["日期_新"].fillna(merged["日期_原"]),
+        "變更": change,
+        "原上班": merged[f"{CLOCK_IN}_原"],
+        "原下班": merged[f"{CLOCK_OUT}_原"],
+        "原工時": merged["工作時數(小時)_原"],
+        "新上班": merged[f"{CLOCK_IN}_新"],
+        "新下班": merged[f"{CLOCK_OUT}_新"],
+        "新工時": merged["工作時數(小時)_新"],
+    })
+    return diff.sort_values(["員工", "日期"], kind="stable").reset_index(drop=True)
+
+
+def update_payroll_summary(summary, employee_records, recomputed):
+    """
+    Refresh the summary rows of the recomputed employees only.
+
+    Args:
+        summary: Summary of the previous run (summarize_employee_records)
+        employee_records: Records of the new run
+        recomputed: Nicknames whose records were computed again
+
+    Returns:
+        pd.DataFrame: The summary of employee_records, in record order
+    """
+    recomputed = set(recomputed)
+    fresh = summarize_employee_records({name: employee_records[name]
+                                        for name in employee_records if name in recomputed})
+    kept = summary[summary["員工綽號"].isin(set(employee_records) - recomputed)]
+    combined = pd.concat([kept, fresh], ignore_index=True).set_index("員工綽號")
+    order = [name for name in employee_records if name in combined.index]
+    return combined.loc[order].reset_index()
+
+
+def _format_numbers(values, spec, missing="N/A"):
+    """Format a float Series with spec, using missing for NaN values."""
+    return values.map(spec.format).where(values.notna(), missing)
+
+
+def _format_datetimes(values, spec, missing="N/A"):
+    """Format a datetime Series with spec, using missing for NaT values."""
+    return values.dt.strftime(spec).where(values.notna(), missing)
+
+
+def format_work_time(work_hours):
+    """Shift durations as "X hours Y min" text, N/A where missing."""
+    work_hours = pd.Series(work_hours, dtype=np.float64)
+    whole_hours = np.trunc(work_hours)
+    minutes = np.trunc((work_hours - whole_hours) * 60)
+    return (
+        whole_hours.astype("Int64").astype(str) + " hours "
+        + minutes.astype("Int64").astype(str) + " min"
+    ).where(work_hours.notna(), "N/A")
+
+
+def format_employee_record(record):
+    """
+    Format a typed employee record for display and export.
+
+    Args:
+        record: DataFrame returned by build_employee_record
+
+    Returns:
+        pd.DataFrame: The record as text, laid out like the salary report
+    """
+    work_hours = record["工作時數(小時)"]
+    return pd.DataFrame({
+        "日期": _format_datetimes(record["日期"], "%Y-%m-%d"),
+        "上班": _format_datetimes(record["上班"], "%H:%M:%S"),
+        "下班": _format_datetimes(record["下班"], "%H:%M:%S"),
+        "工作時數(小時)": _format_numbers(work_hours, "{:.2f}"),
+        "工作時間": format_work_time(work_hours),
+        "8-10小時區間": _format_numbers(record["8-10小時區間"], "{:.1f}"),
+        "10-12小時區間": _format_numbers(record["10-12小時區間"], "{:.1f}"),
+        "8-10小時加班費": _format_numbers(record["8-10小時加班費"], "{:.2f}"),
+        "10-12小時加班費": _format_numbers(record["10-12小時加班費"], "{:.2f}"),
+        "工資": _format_numbers(record["工資"], "{:,.0f}", missing=""),
+        "平均薪資": _format_numbers(record["平均薪資"], "{:.2f}", missing=""),
+        "狀態": record["狀態"],
+    })
+
+
+def summarize_employee_records(employee_records):
+    """
+    Total hours and overtime pay of every employee in one groupby pass.
+
+    Args:
+        employee_records: Dictionary with employee names as keys and typed
+            DataFrames (from build_employee_record) as values
+
+    Returns:
+        pd.DataFrame: One row per employee, in record order, with float64
+        columns [員工綽號, 月薪, 時薪, 總工作天數, 總工時, 8-10小時加班費總計,
+        10-12小時加班費總計, 總加班費]
+    """
+    records = {name: df for name, df in employee_records.items() if not df.empty}
+    if not records:
+        return pd.DataFrame(columns=["員工綽號", "月薪", "時薪", "總工作天數", "總工時",
+                                     "8-10小時加班費總計", "10-12小時加班費總計", "總加班費"])
+
+    combined = pd.concat(records, names=["員工綽號", None]).reset_index(level=0)
+    summary = combined.groupby("員工綽號", sort=False).agg(**{
+        "月薪": ("工資", "first"),
+        "時薪": ("平均薪資", "first"),
+        "總工作天數": ("日期", "size"),
+        "總工時": ("工作時數(小時)", "sum"),
+        "8-10小時加班費總計": ("8-10小時加班費", "sum"),
+        "10-12小時加班費總計": ("10-12小時加班費", "sum"),
+    })
+    summary["總加班費"] = summary["8-10小時加班費總計"] + summary["10-12小時加班費總計"]
+    return summary.reset_index()
+
+
+def format_payroll_summary(summary):
+    """
+    Format the summary table for the 薪資摘要 sheet.
+
+    Args:
+        summary: DataFrame returned by summarize_employee_records
+
+    Returns:
+        pd.DataFrame: The summary as text, laid out like the salary report
+    """
+    return pd.DataFrame({
+        "員工綽號": summary["員工綽號"],
+        "月薪": _format_numbers(summary["月薪"], "{:,.0f}", missing=""),
+        "時薪": _format_numbers(summary["時薪"], "{:.2f}", missing=""),
+        "總工時": _format_numbers(summary["總工時"], "{:.2f}"),
+        "8-10小時加班費總計": _format_numbers(summary["8-10小時加班費總計"], "{:.2f}"),
+        "10-12小時加班費總計": _format_numbers(summary["10-12小時加班費總計"], "{:.2f}"),
+        "總加班費": _format_numbers(summary["總加班費"], "{:.2f}"),
+    })
+
+
+def clean_sheet_name(name):
+    """Make an employee nickname usable as an Excel sheet name."""
+    sheet_name = str(name)[:31]  # Excel sheet name limit is 31 characters
+    for char in ['/', '\\', '?', '*', '[', ']', ':']:
+        sheet_name = sheet_name.replace(char, '_')
+    return sheet_name
+
+
+def unique_sheet_names(names):
+    """
+    Map every employee nickname to a distinct Excel sheet name.
+
+    Args:
+        names: Employee nicknames, in sheet order
+
+    Returns:
+        dict: nickname -> sheet name; names that clash after cleaning
+        (Excel compares them case-insensitively) get a numbered suffix
+    """
+    used = {"薪資摘要"}
+    sheet_names = {}
+    for name in names:
+        base = clean_sheet_name(name)
+        sheet_name = base
+        number = 2
+        while sheet_name.lower() in used:
+            suffix = f"({number})"
+            sheet_name = base[:31 - len(suffix)] + suffix
+            number += 1
+        used.add(sheet_name.lower())
+        sheet_names[name] = sheet_name
+    return sheet_names
+
+
+# Employee sheet layout: (header, record column, cell format key)
+EMPLOYEE_SHEET_COLUMNS = [
+    ("日期", "日期", "date"),
+    ("上班", "上班", "time"),
+    ("下班", "下班", "time"),
+    ("工作時數(小時)", "工作時數(小時)", "hours"),
+    ("工作時間", None, None),
+    ("8-10小時區間", "8-10小時區間", "band"),
+    ("10-12小時區間", "10-12小時區間", "band"),
+    ("8-10小時加班費", "8-10小時加班費", "money"),
+    ("10-12小時加班費", "10-12小時加班費", "money"),
+    ("工資", "工資", "salary"),
+    ("平均薪資", "平均薪資", "money"),
+    ("狀態", "狀態", None),
+]
+
+# Employee sheet columns that get a =SUM total row
+EMPLOYEE_TOTAL_COLUMNS = ["工作時數(小時)", "8-10小時區間", "10-12小時區間", "8-10小時加班費", "10-12小時加班費"]
+
+
+def _workbook_formats(workbook):
+    """Cell formats shared by every sheet of the salary report."""
+    return {
+        "header": workbook.add_format({"bold": True, "border": 1, "align": "center"}),
+        "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+        "time": workbook.add_format({"num_format": "hh:mm:ss"}),
+        "hours": workbook.add_format({"num_format": "0.00"}),
+        "band": workbook.add_format({"num_format": "0.0"}),
+        "money": workbook.add_format({"num_format": "#,##0.00"}),
+        "salary": workbook.add_format({"num_format": "#,##0"}),
+        "total_label": workbook.add_format({"bold": True, "top": 1}),
+        "total_hours": workbook.add_format({"bold": True, "top": 1, "num_format": "0.00"}),
+        "total_band": workbook.add_format({"bold": True, "top": 1, "num_format": "0.0"}),
+        "total_money": workbook.add_format({"bold": True, "top": 1, "num_format": "#,##0.00"}),
+    }
+
+
+def _sheet_reference(sheet_name, cell):
+    """Cross-sheet cell reference such as 'A''s sheet'!D32."""
+    return "'{}'!{}".format(sheet_name.replace("'", "''"), cell)
+
+
+def _write_summary_sheet(workbook, formats, summary, sheet_names, row_counts):
+    """
+    Write the 薪資摘要 sheet with its totals as formulas on the employee sheets.
+
+    Each total points at the total row of the employee's own sheet, and the
+    last row adds up every employee. The computed values are stored as the
+    formula results so the file reads correctly before Excel recalculates.
+    """
+    worksheet = workbook.add_worksheet("薪資摘要")
+    headers = ["員工綽號", "月薪", "時薪", "總工時", "8-10小時加班費總計", "10-12小時加班費總計", "總加班費"]
+    worksheet.set_column(0, 0, 14)
+    worksheet.set_column(1, 6, 16)
+    for col, header in enumerate(headers):
+        worksheet.write_string(0, col, header, formats["header"])
+
+    # Column letters of the totals on an employee sheet
+    hours_col, pay_8_10_col, pay_10_12_col = "D", "H", "I"
+    row = 0
+    for row, values in enumerate(zip(summary["員工綽號"], summary["月薪"], summary["時薪"], summary["總工時"],
+                                     summary["8-10小時加班費總計"], summary["10-12小時加班費總計"],
+                                     summary["總加班費"]), start=1):
+        name, salary, hourly_rate, hours, pay_8_10, pay_10_12, pay_total = values
+        worksheet.write_string(row, 0, str(name))
+        if not pd.isna(salary):
+            worksheet.write_number(row, 1, salary, formats["salary"])
+        if not pd.isna(hourly_rate):
+            worksheet.write_number(row, 2, hourly_rate, formats["money"])
+
+        sheet_name = sheet_names.get(name)
+        if sheet_name is None:
+            worksheet.write_number(row, 3, hours, formats["hours"])
+            worksheet.write_number(row, 4, pay_8_10, formats["money"])
+            worksheet.write_number(row, 5, pay_10_12, formats["money"])
+        else:
+            total_row = row_counts[name] + 2
+            worksheet.write_formula(row, 3, "=" + _sheet_reference(sheet_name, f"{hours_col}{total_row}"),
+                                    formats["hours"], hours)
+            worksheet.write_formula(row, 4, "=" + _sheet_reference(sheet_name, f"{pay_8_10_col}{total_row}"),
+                                    formats["money"], pay_8_10)
+            worksheet.write_formula(row, 5, "=" + _sheet_reference(sheet_name, f"{pay_10_12_col}{total_row}"),
+                                    formats["money"], pay_10_12)
+        worksheet.write_formula(row, 6, f"=E{row + 1}+F{row + 1}", formats["money"], pay_total)
+
+    if row:
+        total_row = row + 1
+        worksheet.write_string(total_row, 0, "合計", formats["total_label"])
+        for col, letter, fmt, values in [(3, "D", "total_hours", summary["總工時"]),
+                                         (4, "E", "total_money", summary["8-10小時加班費總計"]),
+                                         (5, "F", "total_money", summary["10-12小時加班費總計"]),
+                                         (6, "G", "total_money", summary["總加班費"])]:
+            worksheet.write_formula(total_row, col, f"=SUM({letter}2:{letter}{total_row})", formats[fmt],
+                                    float(np.nansum(values)))
+
+
+def _write_employee_sheet(workbook, formats, sheet_name, record):
+    """
+    Write one employee's record row by row as typed cells plus a =SUM total row.
+
+    Missing hours and pay (shifts that could not be parsed) are written as
+    N/A, which SUM skips.
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.set_column(0, 2, 12)
+    worksheet.set_column(3, 10, 15)
+    worksheet.set_column(11, 11, 30)
+    for col, (header, _, _) in enumerate(EMPLOYEE_SHEET_COLUMNS):
+        worksheet.write_string(0, col, header, formats["header"])
+
+    work_time = format_work_time(record["工作時數(小時)"]).to_numpy(dtype=object)
+    columns = []
+    for header, source, fmt in EMPLOYEE_SHEET_COLUMNS:
+        if source is None:
+            columns.append((work_time, None))
+        elif fmt in ("date", "time"):
+            # Python datetimes for write_datetime; NaT becomes None
+            columns.append((record[source].to_numpy(dtype="datetime64[us]").astype(object), formats[fmt]))
+        elif fmt is None:
+            columns.append((record[source].to_numpy(dtype=object), None))
+        else:
+            columns.append((record[source].to_numpy(dtype=np.float64), formats[fmt]))
+
+    # constant_memory mode: every row is flushed before the next one starts
+    for offset in range(len(record)):
+        row = offset + 1
+        for col, ((values, cell_format), (header, _, fmt)) in enumerate(zip(columns, EMPLOYEE_SHEET_COLUMNS)):
+            value = values[offset]
+            if fmt in ("date", "time"):
+                if value is None:
+                    worksheet.write_string(row, col, "N/A")
+                else:
+                    worksheet.write_datetime(row, col, value, cell_format)
+            elif fmt is None:
+                worksheet.write_string(row, col, "" if value is None else str(value))
+            elif np.isnan(value):
+                # Salary and hourly rate are only on the first row
+                if header not in ("工資", "平均薪資"):
+                    worksheet.write_string(row, col, "N/A")
+            else:
+                worksheet.write_number(row, col, value, cell_format)
+
+    total_row = len(record) + 1
+    worksheet.write_string(total_row, 0, "合計", formats["total_label"])
+    for col, (header, source, fmt) in enumerate(EMPLOYEE_SHEET_COLUMNS):
+        if header in EMPLOYEE_TOTAL_COLUMNS:
+            letter = chr(ord("A") + col)
+            total_format = formats["total_band"] if fmt == "band" else formats[f"total_{fmt}"]
+            worksheet.write_formula(total_row, col, f"=SUM({letter}2:{letter}{total_row})", total_format,
+                                    float(np.nansum(record[source].to_numpy(dtype=np.float64))))
+
+
+def write_payroll_workbook(target, employee_records, summary=None):
+    """
+    Write the salary report: a 薪資摘要 sheet plus one sheet per employee.
+
+    The workbook is written with xlsxwriter's constant_memory mode, so
+    rows are flushed to disk as they are written and memory stays flat no
+    matter how many employee sheets there are. Dates, times, hours and pay
+    are native Excel numbers with cell formats, and every total is a
+    formula.
+
+    Args:
+        target: Path or binary file-like object to write the .xlsx to
+        employee_records: Dictionary with employee names as keys and typed
+            DataFrames as values
+        summary: Summary table from summarize_employee_records (computed
+            here when omitted)
+
+    Returns:
+        pd.DataFrame: The summary table that was written
+    """
+    if summary is None:
+        summary = summarize_employee_records(employee_records)
+
+    records = {name: df for name, df in employee_records.items() if not df.empty}
+    sheet_names = unique_sheet_names(records)
+    row_counts = {name: len(df) for name, df in records.items()}
+
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    try:
+        formats = _workbook_formats(workbook)
+        _write_summary_sheet(workbook, formats, summary, sheet_names, row_counts)
+        for name, df in records.items():
+            _write_employee_sheet(workbook, formats, sheet_names[name], df)
+    finally:
+        workbook.close()
+    return summary
+
+
+def employee_file_names(names):
+    """
+    Map every employee nickname to a distinct .xlsx file name for a report bundle.
+
+    Args:
+        names: Employee nicknames, in sheet order
+
+    Returns:
+        dict: nickname -> file name; path characters are replaced and
+        names that clash (case-insensitively) get a numbered suffix
+    """
+    used = {"薪資摘要.xlsx"}
+    file_names = {}
+    for name in names:
+        base = str(name)
+        for char in ['/', '\\', '?', '*', '[', ']', ':', '"', '<', '>', '|']:
+            base = base.replace(char, '_')
+        base = base.strip(". ") or "_"
+        file_name = f"{base}.xlsx"
+        number = 2
+        while file_name.lower() in used:
+            file_name = f"{base}({number}).xlsx"
+            number += 1
+        used.add(file_name.lower())
+        file_names[name] = file_name
+    return file_names
+
+
+def write_employee_workbook(target, name, record):
+    """
+    Write one employee's record as a workbook of its own.
+
+    Args:
+        target: Path or binary file-like object to write the .xlsx to
+        name: Employee nickname (used as the sheet name)
+        record: Typed DataFrame from build_employee_record
+    """
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    try:
+        _write_employee_sheet(workbook, _workbook_formats(workbook), clean_sheet_name(name), record)
+    finally:
+        workbook.close()
+
+
+def write_summary_workbook(target, summary):
+    """
+    Write the 薪資摘要 sheet as a workbook of its own.
+
+    With no employee sheets to point at, the totals per employee are
+    values and only the 總加班費 column and the 合計 row are formulas.
+
+    Args:
+        target: Path or binary file-like object to write the .xlsx to
+        summary: Summary table from summarize_employee_records
+    """
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    try:
+        _write_summary_sheet(workbook, _workbook_formats(workbook), summary, {}, {})
+    finally:
+        workbook.close()
+
+
+def _render_employee_workbook(job):
+    """Render (file name, name, record) into (file name, .xlsx bytes); runs in a worker process."""
+    file_name, name, record = job
+    buffer = BytesIO()
+    write_employee_workbook(buffer, name, record)
+    return file_name, buffer.getvalue()
+
+
+def write_payroll_bundle(target, employee_records, summary=None, workers=1):
+    """
+    Write the salary report as a zip: 薪資摘要.xlsx plus one workbook per employee.
+
+    The employee workbooks are rendered on a process pool when workers > 1
+    and added to the archive in sheet order as they come back, so only a
+    few rendered workbooks are held in memory at a time. The members are
+    stored uncompressed since .xlsx files are already zip-compressed.
+
+    Args:
+        target: Path or binary file-like object to write the .zip to
+        employee_records: Dictionary with employee names as keys and typed
+            DataFrames as values
+        summary: Summary table from summarize_employee_records (computed
+            here when omitted)
+        workers: Number of worker processes; 1 renders in this process
+
+    Returns:
+        pd.DataFrame: The summary table that was written
+    """
+    if summary is None:
+        summary = summarize_employee_records(employee_records)
+
+    records = {name: df for name, df in employee_records.items() if not df.empty}
+    file_names = employee_file_names(records)
+    jobs = [(file_names[name], name, df) for name, df in records.items()]
+
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as archive:
+        with archive.open("薪資摘要.xlsx", "w") as member:
+            write_summary_workbook(member, summary)
+
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(jobs) // (workers * 4))
+                for file_name, data in executor.map(_render_employee_workbook, jobs, chunksize=chunksize):
+                    archive.writestr(file_name, data)
+        else:
+            for job in jobs:
+                file_name, data = _render_employee_workbook(job)
+                archive.writestr(file_name, data)
+    return summary
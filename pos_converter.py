@@ -1,21 +1,111 @@
+import os
 import pandas as pd
 import streamlit as st
-from io import BytesIO
+from cache import LRUCache, hash_bytes, get_artifact_cache
+from pos_engine import (read_pos_files, merge_pos_subtotals, build_pos_ledger,
+                        daily_revenue, revenue_rollups, downsample_rollup, POS_FORMAT_VERSION)
+from pos_ledger import PosLedger
+
+# Worker processes reading a batch of POS files; 1 reads them in the server
+# process, since a pool costs more than it saves on monthly exports
+POS_WORKERS = int(os.environ.get("POS_WORKERS", "1"))
+
+# Most points sent to the browser per chart; longer series are downsampled with LTTB
+POS_CHART_POINTS = int(os.environ.get("POS_CHART_POINTS", "800"))
+
+# Converted ledgers keyed by the SHA-256 of the uploads, so widget reruns do not read them again
+_pos_cache = LRUCache(max_entries=8)
+
+def convert_pos_files(uploaded_files, workers=POS_WORKERS):
+    """
+    Convert one or more POS exports into one date-ordered ledger
+    
+    Parameters:
+    uploaded_files: Uploaded POS .xlsx files
+    workers: Number of worker processes reading the files
+    
+    Returns:
+    tuple: (final_Sheet1, replaced) - the ledger with a running total carried across
+    every file, and the number of subtotal rows dropped because a later file has the same date
+    """
+    contents = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+    subtotals = read_pos_files(contents, workers=workers)
+    if len(subtotals) == 1:
+        return build_pos_ledger(subtotals[0]), 0
+    
+    merged, replaced = merge_pos_subtotals(subtotals, [uploaded_file.name for uploaded_file in uploaded_files])
+    return build_pos_ledger(merged).reset_index(drop=True), replaced
+
+def show_pos_ledger(final_Sheet1, uploaded_files):
+    """Add the converted days to the persistent ledger and offer the full history"""
+    st.subheader('累積帳本')
+    ledger = PosLedger()
+    last_day, last_total = ledger.last_entry()
+    if last_day is None:
+        st.caption('帳本目前是空的')
+    else:
+        st.caption(f"帳本共 {len(ledger)} 天，最後一天 {last_day}，累積營收/現金 {last_total:,.0f}")
+    
+    if st.button('加入帳本'):
+        source = ", ".join(uploaded_file.name for uploaded_file in uploaded_files)
+        added, skipped = ledger.append(final_Sheet1.iloc[:, :2], source=source)
+        if skipped:
+            st.warning(f"{skipped} 天已在帳本中或早於帳本最後一天，已略過")
+        st.success(f"已加入 {added} 天")
+        last_day, last_total = ledger.last_entry()
+    
+    if last_day is None:
+        return None
+    
+    # The stored history only changes by appending, so its last day and total identify it
+    ledger_key = ("pos_ledger", POS_FORMAT_VERSION, os.path.abspath(ledger.path),
+                  last_day, last_total, len(ledger))
+    
+    def write_workbook(workbook_file):
+        with pd.ExcelWriter(workbook_file, engine='xlsxwriter') as writer:
+            ledger.to_frame().to_excel(writer, sheet_name='Sheet1', index=False)
+    
+    workbook = get_artifact_cache().get_or_create(ledger_key, write_workbook)
+    st.download_button(
+        label="下載完整帳本",
+        data=workbook,
+        file_name=f"累積帳本_{last_day}.xlsx",
+        mime="application/vnd.ms-excel"
+    )
+    return ledger, ledger_key
+
+def show_revenue_charts(load_ledger, key):
+    """Revenue trend per day, week and month with rolling averages"""
+    st.subheader('營收趨勢')
+    # Rollups are computed once per ledger state; reruns only downsample and draw
+    rollups = _pos_cache.get(("rollups",) + key)
+    if rollups is None:
+        rollups = revenue_rollups(daily_revenue(load_ledger()))
+        _pos_cache.put(("rollups",) + key, rollups)
+    
+    period = st.radio('統計週期', list(rollups), horizontal=True)
+    rollup = rollups[period]
+    chart_data = downsample_rollup(rollup, POS_CHART_POINTS)
+    if len(chart_data) < len(rollup):
+        st.caption(f"共 {len(rollup)} 筆，圖表顯示 {len(chart_data)} 個代表點")
+    st.line_chart(chart_data)
 
 def run_pos_converter():
     st.title('POS 轉 Excel')
     
-    # File upload
-    uploaded_file = st.file_uploader('請上傳 POS 資料', type = 'xlsx')
-    if uploaded_file is not None:
-        excel = pd.ExcelFile(uploaded_file)
-        df1 = pd.read_excel(uploaded_file, sheet_name="Sheet1")
-        final_Sheet1 = df1[df1["Unnamed: 1"] == "小結"].iloc[:, [2, 3]]
-        final_Sheet1["時間"] = pd.to_datetime(final_Sheet1.iloc[:, 0])
-        final_Sheet1 = final_Sheet1.sort_values(by="時間", ascending=True)
-        final_Sheet1["時間"] = final_Sheet1["時間"].dt.strftime('%Y/%-m/%-d')
-        final_Sheet1["累積營收/現金"] = final_Sheet1.iloc[:, 1].cumsum()
-        final_Sheet1["備註"] = ""
+    # File upload; several monthly exports are merged into one ledger
+    uploaded_files = st.file_uploader('請上傳 POS 資料', type = 'xlsx', accept_multiple_files=True)
+    if uploaded_files:
+        files_key = tuple(hash_bytes(uploaded_file.getvalue()) for uploaded_file in uploaded_files)
+        cached = _pos_cache.get(files_key)
+        if cached is None:
+            with st.spinner(f'正在轉換 {len(uploaded_files)} 個檔案...'):
+                cached = convert_pos_files(uploaded_files)
+            _pos_cache.put(files_key, cached)
+        final_Sheet1, replaced = cached
+        
+        if replaced:
+            st.warning(f"有 {replaced} 筆小結的日期與較晚上傳的檔案重複，已以較晚上傳的檔案為準")
 
         col1, col2 = st.columns(2)
 
@@ -23,14 +113,28 @@ def run_pos_converter():
             st.markdown("預覽資料")
             st.dataframe(final_Sheet1)
         
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            final_Sheet1.to_excel(writer, sheet_name='Sheet1')
+        # The converted workbook is generated once per set of uploads and shared across sessions
+        def write_workbook(workbook_file):
+            with pd.ExcelWriter(workbook_file, engine='xlsxwriter') as writer:
+                final_Sheet1.to_excel(writer, sheet_name='Sheet1')
+        
+        workbook = get_artifact_cache().get_or_create(
+            ("pos_workbook", POS_FORMAT_VERSION) + files_key, write_workbook
+        )
 
         with col2:
             st.download_button(
                 label="點此下載",
-                data=buffer.getvalue(),
+                data=workbook,
                 file_name="修改後資料.xlsx",
                 mime="application/vnd.ms-excel"
-            )
\ No newline at end of file
+            )
+        
+        stored = show_pos_ledger(final_Sheet1, uploaded_files)
+        
+        # Trends over the whole stored history, or over these uploads while the ledger is empty
+        if stored is None:
+            show_revenue_charts(lambda: final_Sheet1, files_key)
+        else:
+            ledger, ledger_key = stored
+            show_revenue_charts(ledger.to_frame, ledger_key)
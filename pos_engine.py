@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from excel_reader import iter_rows
+
+# Column B of a POS export marks the daily subtotal rows with this label;
+# columns C and D of those rows hold the date and the amount.
+SUBTOTAL_LABEL = "小結"
+POS_SHEET = "Sheet1"
+LABEL_COL, DATE_COL, AMOUNT_COL = 1, 2, 3
+
+# Version of the POS conversion and its workbooks; it is part of every
+# artifact cache key, so bump it whenever the converted output changes
+POS_FORMAT_VERSION = 1
+
+# Rollup periods of the revenue charts: (label, resample rule, rolling window)
+ROLLUP_PERIODS = [("日", "D", 7), ("週", "W-SUN", 4), ("月", "MS", 3)]
+
+
+def iter_subtotal_rows(source, sheet_name=POS_SHEET, backend=None):
+    """
+    Stream the daily subtotal rows of a POS export in one pass.
+
+    Rows come from the excel_reader backend (EXCEL_READER, chosen by file
+    size by default) and only columns A-D are read, so line items are
+    skipped as they go by.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        sheet_name: Sheet holding the POS data
+        backend: excel_reader backend name (default: EXCEL_READER)
+
+    Yields:
+        tuple: (headers, rows) first, where headers are the column C and D
+        names as pandas would read them; then (position, date, amount) for
+        every 小結 row, position being its 0-based data row index
+    """
+    rows = iter_rows(source, sheet_name=sheet_name, max_col=AMOUNT_COL + 1, backend=backend)
+    try:
+        header = next(rows, ())
+        header = tuple(header) + (None,) * (AMOUNT_COL + 1 - len(header))
+        yield tuple(
+            f"Unnamed: {col}" if header[col] is None else header[col]
+            for col in (DATE_COL, AMOUNT_COL)
+        )
+        for position, row in enumerate(rows):
+            if len(row) > AMOUNT_COL and row[LABEL_COL] == SUBTOTAL_LABEL:
+                yield position, row[DATE_COL], row[AMOUNT_COL]
+    finally:
+        rows.close()
+
+
+def read_pos_subtotals(source, sheet_name=POS_SHEET, backend=None):
+    """
+    Read only the daily subtotals of a POS export.
+
+    Args:
+        source: Path or file-like object of the .xlsx file
+        sheet_name: Sheet holding the POS data
+        backend: excel_reader backend name (default: EXCEL_READER)
+
+    Returns:
+        pd.DataFrame: The column C and D values of every 小結 row, indexed
+        by data row position (the same frame as filtering pd.read_excel)
+    """
+    rows = iter_subtotal_rows(source, sheet_name, backend)
+    date_header, amount_header = next(rows)
+    positions, dates, amounts = [], [], []
+    for position, date, amount in rows:
+        positions.append(position)
+        dates.append(date)
+        amounts.append(amount)
+    return pd.DataFrame({date_header: dates, amount_header: amounts}, index=positions)
+
+
+def build_pos_ledger(subtotals):
+    """
+    Turn daily subtotals into the date-ordered ledger with a running total.
+
+    With merged subtotals the running total carries across files, since
+    it is taken over the whole date-ordered ledger.
+
+    Args:
+        subtotals: DataFrame returned by read_pos_subtotals or merge_pos_subtotals
+            (date in the first column, amount in the second)
+
+    Returns:
+        pd.DataFrame: The subtotal columns plus 時間 (YYYY/M/D), 累積營收/現金
+        and an empty 備註 column, sorted by date
+    """
+    ledger = subtotals.copy()
+    ledger["時間"] = pd.to_datetime(ledger.iloc[:, 0])
+    ledger = ledger.sort_values(by="時間", ascending=True, kind="stable")
+    ledger["時間"] = ledger["時間"].dt.strftime('%Y/%-m/%-d')
+    ledger["累積營收/現金"] = ledger.iloc[:, 1].cumsum()
+    ledger["備註"] = ""
+    return ledger
+
+
+def _read_pos_bytes(data):
+    """read_pos_subtotals on the raw bytes of an upload; runs in a worker process."""
+    return read_pos_subtotals(BytesIO(data))
+
+
+def read_pos_files(contents, workers=1):
+    """
+    Read the subtotals of many POS exports, in parallel when workers > 1.
+
+    Args:
+        contents: Raw .xlsx bytes of every file
+        workers: Number of worker processes; 1 reads in this process
+
+    Returns:
+        list: One DataFrame from read_pos_subtotals per file, in input order
+    """
+    if workers > 1 and len(contents) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(contents))) as executor:
+            return list(executor.map(_read_pos_bytes, contents))
+    return [_read_pos_bytes(data) for data in contents]
+
+
+def merge_pos_subtotals(subtotals, file_names):
+    """
+    Combine the subtotals of several POS exports into one set of days.
+
+    Files may overlap, e.g. a month exported twice. A date found in more
+    than one file is taken only from the last of those files, so a later
+    export replaces an earlier one.
+
+    Args:
+        subtotals: DataFrames from read_pos_subtotals, in upload order
+        file_names: Name of every file
+
+    Returns:
+        tuple: (merged, replaced) where merged has the date and amount
+        columns (named after the first file), a 檔案 column and a fresh
+        index, and replaced is the number of subtotal rows dropped as
+        duplicates
+    """
+    headers = list(subtotals[0].columns)
+    frames = [
+        frame.set_axis(headers, axis=1).assign(檔案=name, _file_order=order)
+        for order, (frame, name) in enumerate(zip(subtotals, file_names))
+    ]
+    merged = pd.concat(frames, ignore_index=True)
+
+    day = pd.to_datetime(merged.iloc[:, 0]).dt.normalize()
+    latest = merged["_file_order"].groupby(day).transform("max")
+    keep = (merged["_file_order"] == latest).to_numpy()
+    replaced = int((~keep).sum())
+    merged = merged[keep].drop(columns="_file_order").reset_index(drop=True)
+    return merged, replaced
+
+
+def daily_revenue(ledger):
+    """
+    Daily revenue series of a converted ledger.
+
+    Args:
+        ledger: DataFrame with the date in the first column and the amount
+            in the second (build_pos_ledger or PosLedger.to_frame)
+
+    Returns:
+        pd.Series: float64 amounts indexed by day, with days without a
+        subtotal filled in as 0
+    """
+    days = pd.to_datetime(ledger.iloc[:, 0]).dt.normalize()
+    amounts = pd.to_numeric(ledger.iloc[:, 1]).astype(float)
+    return amounts.groupby(days.to_numpy()).sum().asfreq("D", fill_value=0.0)
+
+
+def revenue_rollups(daily):
+    """
+    Day, week and month revenue with rolling averages, computed once.
+
+    Args:
+        daily: Series returned by daily_revenue
+
+    Returns:
+        dict: period label (日/週/月) -> DataFrame indexed by period start
+        with columns [營收, 移動平均]; the average spans 7 days, 4 weeks or
+        3 months
+    """
+    rollups = {}
+    for label, rule, window in ROLLUP_PERIODS:
+        revenue = daily if rule == "D" else daily.resample(rule).sum()
+        rollups[label] = pd.DataFrame({
+            "營收": revenue,
+            "移動平均": revenue.rolling(window, min_periods=1).mean(),
+        })
+    return rollups
+
+
+def lttb_indices(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    The first and last points are kept; every bucket in between contributes
+    the point forming the largest triangle with the previously kept point
+    and the mean of the next bucket, which preserves peaks and dips in
+    order.
+
+    Args:
+        y: Array-like of values
+        threshold: Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted positions of the kept points
+    """
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    x = np.arange(count, dtype=np.float64)
+    # Bucket edges over the points between the first and the last one
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else count
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample_rollup(rollup, max_points):
+    """
+    Cut a rollup down to at most max_points rows with LTTB on its revenue.
+
+    Args:
+        rollup: DataFrame from revenue_rollups
+        max_points: Largest number of rows to return
+
+    Returns:
+        pd.DataFrame: The kept rows, in date order
+    """
+    if len(rollup) <= max_points:
+        return rollup
+    return rollup.iloc[lttb_indices(rollup["營收"].to_numpy(), max_points)]
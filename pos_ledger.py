@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+# SQLite file holding every day ever added from a POS export
+POS_LEDGER_PATH = os.environ.get("POS_LEDGER_PATH", "pos_ledger.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_subtotals (
+    day TEXT PRIMARY KEY,
+    amount REAL NOT NULL,
+    cumulative REAL NOT NULL,
+    source TEXT,
+    added_at TEXT
+)
+"""
+
+
+class PosLedger:
+    """
+    Append-only ledger of daily POS subtotals with a stored running total.
+
+    Each day is stored once with its amount and the cumulative total up to
+    that day, so adding a month only touches the new days: the running
+    total continues from the last stored row and earlier rows are never
+    rewritten. Reading the full history is a single query.
+    """
+
+    def __init__(self, path=POS_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def last_entry(self):
+        """Return (day, cumulative) of the latest stored day, or (None, 0.0) for an empty ledger."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT day, cumulative FROM daily_subtotals ORDER BY day DESC LIMIT 1"
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, 0.0)
+
+    def append(self, subtotals, source=""):
+        """
+        Add the days after the last stored day.
+
+        Days already in the ledger, or older than its last day, are skipped:
+        inserting them would change the running total of every later day.
+
+        Args:
+            subtotals: DataFrame with the date in the first column and the
+                amount in the second (read_pos_subtotals / merge_pos_subtotals layout)
+            source: File name(s) stored with the new days
+
+        Returns:
+            tuple: (added, skipped) numbers of days
+        """
+        days = pd.DataFrame({
+            "day": pd.to_datetime(subtotals.iloc[:, 0]).dt.strftime("%Y-%m-%d").to_numpy(),
+            "amount": pd.to_numeric(subtotals.iloc[:, 1]).astype(float).to_numpy(),
+        })
+        # One row per day; several subtotals of a day add up, as in build_pos_ledger
+        days = days.groupby("day", as_index=False, sort=True)["amount"].sum()
+
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT day, cumulative FROM daily_subtotals ORDER BY day DESC LIMIT 1"
+            ).fetchone()
+            last_day, last_total = row if row else (None, 0.0)
+
+            new_days = days if last_day is None else days[days["day"] > last_day]
+            cumulative = last_total + new_days["amount"].cumsum()
+            added_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            connection.executemany(
+                "INSERT INTO daily_subtotals (day, amount, cumulative, source, added_at) VALUES (?, ?, ?, ?, ?)",
+                zip(new_days["day"], new_days["amount"], cumulative, [source] * len(new_days),
+                    [added_at] * len(new_days)),
+            )
+        return len(new_days), len(days) - len(new_days)
+
+    def to_frame(self):
+        """
+        Read the whole ledger in the converter's layout.
+
+        Returns:
+            pd.DataFrame: Columns [日期, 金額, 時間, 累積營收/現金, 備註, 檔案] in date order
+        """
+        with self._connect() as connection:
+            ledger = pd.read_sql_query(
+                "SELECT day, amount, cumulative, source FROM daily_subtotals ORDER BY day", connection
+            )
+        day = pd.to_datetime(ledger["day"])
+        return pd.DataFrame({
+            "日期": ledger["day"],
+            "金額": ledger["amount"],
+            "時間": day.dt.strftime('%Y/%-m/%-d'),
+            "累積營收/現金": ledger["cumulative"],
+            "備註": "",
+            "檔案": ledger["source"],
+        })
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM daily_subtotals").fetchone()[0]
@@ -0,0 +1,276 @@
+"""
+Salary history in Firestore.
+
+Every saved payroll run is written as one SalaryDays document per employee
+and work day, plus one SalaryMonths rollup per employee and month. Year to
+date figures are read from the rollups only, so the original time record
+files are never needed again.
+
+Days are saved under a source label chosen by the user (e.g. the store),
+not the file name, so saving a corrected file under the same label
+replaces the earlier save while another store's days are kept.
+"""
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from employee_bulk import commit_in_batches
+
+DAYS_COLLECTION = "SalaryDays"
+MONTHS_COLLECTION = "SalaryMonths"
+
+# Fields of a SalaryDays document, as produced by daily_history
+DAY_FIELDS = ["Nickname", "Date", "Month", "Year", "Shifts", "Hours",
+              "Overtime_Hours_8_10", "Overtime_Hours_10_12",
+              "Overtime_Pay_8_10", "Overtime_Pay_10_12", "Salary", "Hourly_Rate", "Shift_Digest"]
+
+# Rollup fields read by the year-to-date query
+ROLLUP_FIELDS = ["Nickname", "Month", "Work_Days", "Shifts", "Hours",
+                 "Overtime_Pay_8_10", "Overtime_Pay_10_12", "Overtime_Pay"]
+
+
+def _document_id(nickname, key):
+    """Document ID of an employee's day or month; '/' is not allowed in IDs."""
+    return f"{str(nickname).replace('/', '_')}_{key}"
+
+
+def _shift_digest(shifts):
+    """Digest of one day's shifts, independent of their order."""
+    return hashlib.sha1("|".join(sorted(shifts)).encode()).hexdigest()[:16]
+
+
+def daily_history(employee_records):
+    """
+    Collapse payroll records into one row per employee and work day.
+
+    Shifts without a parsed date cannot be placed on a day and are left out.
+
+    Args:
+        employee_records: Dictionary with employee names as keys and typed
+            DataFrames (from build_employee_record) as values
+
+    Returns:
+        pd.DataFrame: Columns [Nickname, Date, Month, Year, Shifts, Hours,
+        Overtime_Hours_8_10, Overtime_Hours_10_12, Overtime_Pay_8_10,
+        Overtime_Pay_10_12, Salary, Hourly_Rate, Shift_Digest], where
+        Shift_Digest identifies the clock-in and clock-out times of the day
+    """
+    records = {name: df for name, df in employee_records.items() if not df.empty}
+    if not records:
+        return pd.DataFrame(columns=DAY_FIELDS)
+
+    combined = pd.concat(records, names=["Nickname", None]).reset_index(level=0)
+    # Salary and hourly rate are only on the first row of each record
+    combined["Salary"] = combined.groupby("Nickname", sort=False)["工資"].transform("first")
+    combined["Hourly_Rate"] = combined.groupby("Nickname", sort=False)["平均薪資"].transform("first")
+    combined = combined[combined["日期"].notna()]
+    combined["Date"] = combined["日期"].dt.strftime("%Y-%m-%d")
+    combined["Shift"] = combined["上班"].astype(str) + "~" + combined["下班"].astype(str)
+
+    daily = combined.groupby(["Nickname", "Date"], sort=False).agg(
+        Shifts=("日期", "size"),
+        Hours=("工作時數(小時)", "sum"),
+        Overtime_Hours_8_10=("8-10小時區間", "sum"),
+        Overtime_Hours_10_12=("10-12小時區間", "sum"),
+        Overtime_Pay_8_10=("8-10小時加班費", "sum"),
+        Overtime_Pay_10_12=("10-12小時加班費", "sum"),
+        Salary=("Salary", "first"),
+        Hourly_Rate=("Hourly_Rate", "first"),
+        Shift_Digest=("Shift", _shift_digest),
+    ).reset_index()
+    daily.insert(2, "Month", daily["Date"].str[:7])
+    daily.insert(3, "Year", daily["Date"].str[:4].astype(int))
+    return daily
+
+
+def monthly_rollups(daily):
+    """
+    Roll the daily history up to one row per employee and month.
+
+    A date found in more than one row (days saved from several files)
+    counts as one work day; shifts, hours and pay are added up.
+
+    Args:
+        daily: DataFrame returned by daily_history, or stored SalaryDays
+
+    Returns:
+        pd.DataFrame: Columns [Nickname, Month, Year, Work_Days, Shifts, Hours,
+        Overtime_Pay_8_10, Overtime_Pay_10_12, Overtime_Pay, Salary, Hourly_Rate]
+    """
+    monthly = daily.groupby(["Nickname", "Month"], sort=False).agg(
+        Year=("Year", "first"),
+        Work_Days=("Date", "nunique"),
+        Shifts=("Shifts", "sum"),
+        Hours=("Hours", "sum"),
+        Overtime_Pay_8_10=("Overtime_Pay_8_10", "sum"),
+        Overtime_Pay_10_12=("Overtime_Pay_10_12", "sum"),
+        Salary=("Salary", "first"),
+        Hourly_Rate=("Hourly_Rate", "first"),
+    ).reset_index()
+    monthly.insert(monthly.columns.get_loc("Salary"), "Overtime_Pay",
+                   monthly["Overtime_Pay_8_10"] + monthly["Overtime_Pay_10_12"])
+    return monthly
+
+
+def _firestore_values(row):
+    """Convert a history row to plain Python values Firestore can store."""
+    values = {}
+    for key, value in row.items():
+        if pd.isna(value):
+            value = None
+        elif hasattr(value, "item"):
+            value = value.item()
+        values[key] = value
+    return values
+
+
+def _stored_days(query):
+    """Stored SalaryDays of a query as (snapshot, fields) pairs."""
+    return [(snapshot, snapshot.to_dict() or {}) for snapshot in query.select(DAY_FIELDS + ["Source"]).get()]
+
+
+def find_duplicate_days(db, daily, source):
+    """
+    Find days of a run that another source already saved with the same shifts.
+
+    Such days are almost always the same time record saved under a second
+    label, which would count the shifts twice in the rollups.
+
+    Args:
+        db: Firestore client instance
+        daily: DataFrame returned by daily_history
+        source: Source label the run is about to be saved under
+
+    Returns:
+        pd.DataFrame: Columns [員工綽號, 日期, 已儲存來源]
+    """
+    shifts = {(row["Nickname"], row["Date"]): row["Shift_Digest"] for row in daily.to_dict("records")}
+    duplicates = []
+    days = db.collection(DAYS_COLLECTION)
+    for month in daily["Month"].unique():
+        for _, stored in _stored_days(days.where(filter=FieldFilter("Month", "==", month))):
+            key = (stored.get("Nickname"), stored.get("Date"))
+            if (stored.get("Source", "") != source and key in shifts
+                    and stored.get("Shift_Digest") == shifts[key]):
+                duplicates.append({"員工綽號": key[0], "日期": key[1], "已儲存來源": stored.get("Source", "")})
+    return pd.DataFrame(duplicates, columns=["員工綽號", "日期", "已儲存來源"])
+
+
+def save_salary_history(db, employee_records, source):
+    """
+    Store payroll records as daily documents and monthly rollups.
+
+    Saving under the same source label again replaces that source: its
+    days are overwritten and every day it saved before that is no longer
+    in the records is deleted, whatever the employee or month. Days of
+    other sources (e.g. another store) are kept. Every monthly rollup
+    touched by the old or the new days is rebuilt from all stored days of
+    that employee and month, or deleted when none are left. All writes go
+    through batched commits.
+
+    Args:
+        db: Firestore client instance
+        employee_records: Dictionary with employee names as keys and typed
+            DataFrames as values
+        source: Source label of the time record, e.g. the store name
+
+    Returns:
+        tuple: (days_written, months_written, failed_writes)
+
+    Raises:
+        ValueError: The source label is empty, or another source already
+            saved identical shifts (see find_duplicate_days)
+    """
+    source = str(source).strip()
+    if not source:
+        raise ValueError("請輸入薪資歷史的來源名稱 (例如門市名稱)")
+    daily = daily_history(employee_records)
+    if daily.empty:
+        return 0, 0, 0
+
+    duplicates = find_duplicate_days(db, daily, source)
+    if not duplicates.empty:
+        sources = "、".join(sorted(duplicates["已儲存來源"].unique()))
+        raise ValueError(f"有 {len(duplicates)} 天的班次已以來源「{sources}」儲存過，"
+                         f"請使用相同的來源名稱重新儲存，以免重複計算")
+
+    days = db.collection(DAYS_COLLECTION)
+    months = db.collection(MONTHS_COLLECTION)
+    saved_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    writes = []
+
+    day_ids = set()
+    for row in daily.to_dict("records"):
+        document_id = _document_id(row["Nickname"], f"{row['Date']}_{source}")
+        day_ids.add(document_id)
+        data = {**_firestore_values(row), "Source": source, "saved_at": saved_at}
+        writes.append((document_id, lambda batch, ref=days.document(document_id), data=data: batch.set(ref, data)))
+
+    # Every rollup holding a day of this source, before or after this save
+    touched = set(zip(daily["Nickname"], daily["Month"]))
+    for snapshot, stored in _stored_days(days.where(filter=FieldFilter("Source", "==", source))):
+        touched.add((stored.get("Nickname"), stored.get("Month")))
+        if snapshot.id not in day_ids:
+            writes.append((snapshot.id, lambda batch, ref=snapshot.reference: batch.delete(ref)))
+
+    # Days of other sources in the touched rollups
+    other_days = []
+    for month in sorted({month for _, month in touched}):
+        for _, stored in _stored_days(days.where(filter=FieldFilter("Month", "==", month))):
+            if stored.get("Source", "") != source and (stored.get("Nickname"), month) in touched:
+                other_days.append(stored)
+
+    if other_days:
+        # Employees saved from several sources on one day count that day once
+        all_days = pd.concat([daily, pd.DataFrame(other_days, columns=DAY_FIELDS)], ignore_index=True)
+    else:
+        all_days = daily
+    monthly = monthly_rollups(all_days)
+
+    for row in monthly.to_dict("records"):
+        document_id = _document_id(row["Nickname"], row["Month"])
+        data = {**_firestore_values(row), "saved_at": saved_at}
+        writes.append((document_id, lambda batch, ref=months.document(document_id), data=data: batch.set(ref, data)))
+
+    # Rollups whose days all belonged to this source and are gone now
+    for nickname, month in touched - set(zip(monthly["Nickname"], monthly["Month"])):
+        document_id = _document_id(nickname, month)
+        writes.append((document_id, lambda batch, ref=months.document(document_id): batch.delete(ref)))
+
+    errors = commit_in_batches(db, writes)
+    return len(daily), len(monthly), len(errors)
+
+
+def get_year_to_date(db, year, through_month=None):
+    """
+    Year-to-date hours and overtime pay of every employee, from the rollups only.
+
+    Args:
+        db: Firestore client instance
+        year: Calendar year
+        through_month: Last month to include, 1-12 (default: every saved month)
+
+    Returns:
+        pd.DataFrame: Columns [員工綽號, 月數, 總工作天數, 總班次, 總工時,
+        8-10小時加班費總計, 10-12小時加班費總計, 總加班費], sorted by nickname
+    """
+    query = db.collection(MONTHS_COLLECTION).where(filter=FieldFilter("Year", "==", int(year)))
+    rollups = pd.DataFrame(
+        [snapshot.to_dict() for snapshot in query.select(ROLLUP_FIELDS).get()],
+        columns=ROLLUP_FIELDS,
+    )
+    if through_month is not None:
+        rollups = rollups[rollups["Month"] <= f"{int(year):04d}-{int(through_month):02d}"]
+
+    ytd = rollups.groupby("Nickname").agg(**{
+        "月數": ("Month", "nunique"),
+        "總工作天數": ("Work_Days", "sum"),
+        "總班次": ("Shifts", "sum"),
+        "總工時": ("Hours", "sum"),
+        "8-10小時加班費總計": ("Overtime_Pay_8_10", "sum"),
+        "10-12小時加班費總計": ("Overtime_Pay_10_12", "sum"),
+        "總加班費": ("Overtime_Pay", "sum"),
+    })
+    return ytd.rename_axis("員工綽號").reset_index()
@@ -0,0 +1,187 @@
+from enum import Enum
+from types import SimpleNamespace
+
+import numpy as np
+
+import employee_index
+import utils
+from employee_index import EMPLOYEE_COLUMNS, EmployeeIndex, get_employee_index
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class FakeDocument:
+    def __init__(self, document_id, data):
+        self.id = document_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeCollection:
+    """Local stand-in for an Employee collection that emits change events to its listener."""
+
+    def __init__(self):
+        self.callback = None
+        self.unsubscribed = False
+        # The watch stream, with is_active like google.cloud.firestore_v1.watch.Watch
+        self.watch = SimpleNamespace(is_active=True, unsubscribe=self._unsubscribe)
+
+    def on_snapshot(self, callback):
+        self.callback = callback
+        return self.watch
+
+    def _unsubscribe(self):
+        self.unsubscribed = True
+        self.watch.is_active = False
+
+    def emit(self, *changes, read_time="t"):
+        """Deliver one snapshot made of (type name, nickname, data) changes."""
+        events = [SimpleNamespace(type=ChangeType[kind], document=FakeDocument(nickname, data))
+                  for kind, nickname, data in changes]
+        self.callback([event.document for event in events], events, read_time)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_index():
+    collection = FakeCollection()
+    clock = FakeClock()
+    return EmployeeIndex(collection, clock=clock).start(), collection, clock
+
+
+def test_added_modified_removed_events_update_the_table():
+    index, collection, clock = make_index()
+    assert not index.is_ready
+    assert index.staleness_seconds() is None
+    assert index.to_frame().columns.tolist() == EMPLOYEE_COLUMNS
+    assert index.to_frame().empty
+
+    collection.emit(
+        ("ADDED", "小明", {"Name": "王小明", "Salary": 30000, "Hourly_Rate": 125}),
+        ("ADDED", "阿華", {"Name": "李華", "Salary": 28000}),
+        read_time="t1",
+    )
+    assert index.wait_until_ready(0)
+    assert index.get("小明") == ("王小明", 30000, 125)
+    assert index.get("阿華") == ("李華", 28000, 0)
+    assert index.get("nobody") is None
+    assert index.last_read_time == "t1"
+
+    collection.emit(("MODIFIED", "小明", {"Name": "王小明", "Salary": 32000, "Hourly_Rate": 133.33}),
+                    ("REMOVED", "阿華", None), read_time="t2")
+    assert index.get("小明") == ("王小明", 32000, 133.33)
+    assert index.get("阿華") is None
+    assert index.snapshot_count == 2
+    assert index.last_read_time == "t2"
+
+    frame = index.to_frame()
+    assert frame["綽號"].tolist() == ["小明"]
+    assert frame["全名"].tolist() == ["王小明"]
+    assert frame["月薪"].dtype == np.float64
+    assert frame["月薪"].tolist() == [32000.0]
+    assert frame["平均薪資"].tolist() == [133.33]
+
+
+def test_staleness_tracks_the_watch_stream_not_the_last_change():
+    index, collection, clock = make_index()
+    collection.emit(("ADDED", "小明", {"Name": "王小明", "Salary": 30000, "Hourly_Rate": 125}))
+    assert index.is_healthy
+
+    # A quiet collection is still up to date
+    clock.now += 600
+    assert index.staleness_seconds() == 0
+    assert index.seconds_since_last_change() == 600
+
+    # A dead stream is detected and its data ages from the last time it was seen up
+    collection.watch.is_active = False
+    assert not index.is_healthy
+    clock.now += 42.5
+    assert index.staleness_seconds() == 42.5
+
+
+def test_local_writes_show_before_their_change_event():
+    index, collection, _ = make_index()
+    collection.emit(("ADDED", "小明", {"Name": "王小明", "Salary": 30000, "Hourly_Rate": 125}))
+
+    index.apply_write("阿華", {"Name": "李華", "Salary": 28000.0, "Hourly_Rate": 116.67, "created_at": "x"})
+    index.apply_write("小明", {"Salary": 32000.0})
+    assert index.get("阿華") == ("李華", 28000.0, 116.67)
+    assert index.get("小明") == ("王小明", 32000.0, 125)
+
+    index.apply_remove("小明")
+    assert index.to_frame()["綽號"].tolist() == ["阿華"]
+
+    # The listener's own event for the write replaces the local copy
+    collection.emit(("MODIFIED", "阿華", {"Name": "李華", "Salary": 28000, "Hourly_Rate": 120}))
+    assert index.get("阿華") == ("李華", 28000, 120)
+
+
+class FakeDb:
+    """Firestore client whose Employee collection can be listened to or read once."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.listeners = []
+        self.reads = 0
+
+    def collection(self, name):
+        return self
+
+    def select(self, fields):
+        return self
+
+    def on_snapshot(self, callback):
+        listener = FakeCollection()
+        listener.on_snapshot(callback)
+        self.listeners.append(listener)
+        return listener.watch
+
+    def get(self):
+        self.reads += 1
+        return [FakeDocument(nickname, data) for nickname, data in self.documents.items()]
+
+
+def test_dead_listener_falls_back_to_reads_and_restarts(monkeypatch):
+    monkeypatch.setattr(utils, "EMPLOYEE_REALTIME", True)
+    monkeypatch.setitem(employee_index._index_state, "index", None)
+    monkeypatch.setitem(employee_index._index_state, "db", None)
+    monkeypatch.setitem(utils._employee_cache, "frame", None)
+    db = FakeDb({"小明": {"Name": "王小明", "Salary": 30000, "Hourly_Rate": 125}})
+
+    # The first listener delivers the collection and serves reads
+    index = get_employee_index(db, timeout=0)
+    db.listeners[0].emit(*[("ADDED", nickname, data) for nickname, data in db.documents.items()])
+    assert utils.get_all_employees(db)["綽號"].tolist() == ["小明"]
+    assert db.reads == 0
+
+    # Writes of this process are served right away
+    utils.cache_employee_upsert("阿華", {"Name": "李華", "Salary": 28000.0, "Hourly_Rate": 116.67})
+    assert utils.get_all_employees(db)["綽號"].tolist() == ["小明", "阿華"]
+
+    # Once the stream dies the table is read from Firestore and a new listener is started
+    db.documents["阿華"] = {"Name": "李華", "Salary": 28000.0, "Hourly_Rate": 116.67}
+    db.listeners[0].watch.is_active = False
+    assert utils.get_all_employees(db)["綽號"].tolist() == ["小明", "阿華"]
+    assert db.reads == 1
+    assert len(db.listeners) == 2
+    assert get_employee_index(db, timeout=0) is not index
+    index.stop()
+    employee_index._index_state["index"].stop()
+
+
+def test_stop_unsubscribes_the_listener():
+    index, collection, _ = make_index()
+    index.stop()
+    assert collection.unsubscribed
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from excel_reader import available_backends, iter_rows
+from pos_engine import build_pos_ledger, read_pos_subtotals
+
+
+@pytest.fixture
+def offset_workbook(tmp_path):
+    """A sheet whose first used cell is B2, with a date at midnight."""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet["B2"], worksheet["C2"] = "hdr", "x"
+    worksheet["B3"], worksheet["C3"] = datetime(2024, 1, 1), datetime(2024, 1, 1, 8, 30)
+    worksheet["B4"], worksheet["C4"] = 3, 2.5
+    path = tmp_path / "offset.xlsx"
+    workbook.save(path)
+    return path
+
+
+@pytest.fixture
+def pos_workbook(tmp_path):
+    """A POS export with date cells at midnight."""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = "Sheet1"
+    worksheet.append(["門市", None, "日期", "金額"])
+    for day in (3, 1, 2):
+        worksheet.append(["門市", None, datetime(2024, 1, day), 100 * day])
+        worksheet.append([None, "小結", datetime(2024, 1, day), 100 * day])
+    path = tmp_path / "pos.xlsx"
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_keep_column_positions_and_dates(offset_workbook, backend):
+    rows = list(iter_rows(offset_workbook, backend=backend))
+    assert rows[1][:3] == (None, "hdr", "x")
+    assert rows[2][1] == datetime(2024, 1, 1)
+    assert type(rows[2][1]) is datetime
+    assert rows[3][1:3] == (3, 2.5)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_pos_ledger_matches_across_backends(pos_workbook, backend):
+    expected = build_pos_ledger(read_pos_subtotals(pos_workbook, backend="openpyxl"))
+    ledger = build_pos_ledger(read_pos_subtotals(pos_workbook, backend=backend))
+    assert ledger.equals(expected)
+    assert list(ledger["時間"]) == ["2024/1/1", "2024/1/2", "2024/1/3"]
@@ -0,0 +1,21 @@
+import os
+
+from payroll_cli import report_labels
+
+
+def test_same_file_name_in_two_directories_gets_two_reports(tmp_path):
+    files = [str(tmp_path / "2024" / "04.xlsx"), str(tmp_path / "2025" / "04.xlsx")]
+    labels = report_labels(files)
+    assert labels[files[0]] == ("2024/04.xlsx", "2024_04")
+    assert labels[files[1]] == ("2025/04.xlsx", "2025_04")
+
+
+def test_files_of_one_directory_keep_their_names(tmp_path):
+    files = [str(tmp_path / "04.xlsx"), str(tmp_path / "05.xlsx")]
+    assert [labels for labels in report_labels(files).values()] == [("04.xlsx", "04"), ("05.xlsx", "05")]
+
+
+def test_flattened_names_that_collide_get_a_suffix(tmp_path):
+    files = [str(tmp_path / "a" / "b.xlsx"), str(tmp_path / "a_b.xlsx")]
+    names = [name for _, name in report_labels(files).values()]
+    assert names == ["a_b", "a_b_2"]
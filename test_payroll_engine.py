@@ -0,0 +1,164 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import make_time_records
+from payroll_engine import (LABEL_COLUMN, compute_payroll, compute_payroll_stream, overtime_bands,
+                            pair_clock_rows, round_up_to_12_minutes, segment_employee_blocks)
+
+
+def scalar_overtime(work_duration_hours, hourly_rate):
+    """The per-shift math.ceil banding that overtime_bands replaced, kept as the reference."""
+    if math.isnan(work_duration_hours):
+        return math.nan, math.nan, math.nan, math.nan
+
+    # Calculate hours in 8-10 hour interval
+    hours_in_8_10 = 0
+    if work_duration_hours > 8:
+        if work_duration_hours >= 10:
+            hours_in_8_10 = 2
+        else:
+            hours_in_8_10 = work_duration_hours - 8
+
+        # Round to nearest 0.2 hours (12 minutes)
+        minutes_fraction = (hours_in_8_10 * 60) % 60
+        hours_in_8_10 = int(hours_in_8_10) + (math.ceil(minutes_fraction / 12) * 0.2)
+
+    # Calculate hours in 10-12 hour interval
+    hours_in_10_12 = 0
+    if work_duration_hours > 10:
+        hours_in_10_12 = work_duration_hours - 10
+
+        # Round to nearest 0.2 hours (12 minutes)
+        minutes_fraction = (hours_in_10_12 * 60) % 60
+        hours_in_10_12 = int(hours_in_10_12) + (math.ceil(minutes_fraction / 12) * 0.2)
+
+    payment_8_10 = hours_in_8_10 * hourly_rate * 1.33
+    payment_10_12 = hours_in_10_12 * hourly_rate * 1.67
+    return hours_in_8_10, hours_in_10_12, payment_8_10, payment_10_12
+
+
+def duration_grid():
+    """Every whole second from 0 to 16 hours, band edges, NaN and random durations."""
+    durations = [seconds / 3600 for seconds in range(16 * 3600 + 1)]
+    durations += [8.0, 10.0, 12.0, 12.5, 13.0, 24.0, math.nan, 0.0, 8 + 1e-9, 10 - 1e-9]
+    rng = random.Random(0)
+    durations += [rng.uniform(0, 16) for _ in range(20000)]
+    return durations
+
+
+def assert_bit_identical(actual, expected):
+    expected = np.asarray(expected, dtype=np.float64)
+    assert actual.dtype == np.float64
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    present = ~np.isnan(expected)
+    mismatch = actual[present].view(np.int64) != expected[present].view(np.int64)
+    assert not mismatch.any(), f"first mismatch at duration index {np.flatnonzero(present)[mismatch][0]}"
+
+
+@pytest.mark.parametrize("hourly_rate", [125.0, 183.33, 0.0])
+def test_overtime_bands_match_scalar_code(hourly_rate):
+    durations = duration_grid()
+    expected = [scalar_overtime(hours, hourly_rate) for hours in durations]
+    actual = overtime_bands(durations, hourly_rate)
+    for column, result in enumerate(actual):
+        assert_bit_identical(result, [row[column] for row in expected])
+
+
+def test_overtime_bands_per_shift_rates():
+    durations = duration_grid()[::97]
+    rates = [100.0 + (position % 7) * 12.5 for position in range(len(durations))]
+    expected = [scalar_overtime(hours, rate) for hours, rate in zip(durations, rates)]
+    actual = overtime_bands(durations, rates)
+    for column, result in enumerate(actual):
+        assert_bit_identical(result, [row[column] for row in expected])
+
+
+def test_band_edges():
+    hours_8_10, hours_10_12, _, _ = overtime_bands([8.0, 10.0, 12.0, 13.0, math.nan], 100.0)
+    assert hours_8_10[:4].tolist() == [0.0, 2.0, 2.0, 2.0]
+    assert hours_10_12[:4].tolist() == [0.0, 0.0, 2.0, 3.0]
+    assert np.isnan(hours_8_10[4]) and np.isnan(hours_10_12[4])
+
+
+def test_round_up_to_12_minutes():
+    rounded = round_up_to_12_minutes([0.0, 0.01, 0.2, 1.25, 1.9])
+    assert rounded.tolist() == pytest.approx([0.0, 0.2, 0.2, 1.4, 2.0])
+
+
+def time_record_sheet():
+    """Time records covering lone clock rows, a missing 總時數 and a repeated nickname."""
+    rows = [
+        ("小明", None),
+        ("上班", "2025-04-01 09:00:00"), ("下班", "2025-04-01 18:00:00"),
+        ("上班", "2025-04-02 09:00:00"),  # lone 上班: the next clock row is another 上班
+        ("上班", "2025-04-03 09:00:00"), ("下班", "2025-04-03 20:30:00"),
+        ("總時數", None),
+        ("阿華", None),
+        ("下班", "2025-04-01 17:00:00"),  # lone 下班
+        ("上班", "2025-04-02 08:00:00"), ("下班", "2025-04-02 19:00:00"),
+        # no 總時數: the next nickname closes the block
+        ("小美", None),
+        ("上班", "2025-04-01 22:00:00"), ("下班", "2025-04-02 07:00:00"),
+        ("總時數", None),
+        ("小明", None),  # repeated nickname: only the first block counts
+        ("上班", "2025-04-05 09:00:00"), ("下班", "2025-04-05 18:00:00"),
+        ("總時數", None),
+        ("上班", "2025-04-06 09:00:00"), ("下班", "2025-04-06 18:00:00"),  # outside any block
+    ]
+    return pd.DataFrame(rows, columns=[LABEL_COLUMN, "打卡時間"])
+
+
+def test_pair_clock_rows_skips_unpaired_and_repeated_rows():
+    pairs = pair_clock_rows(time_record_sheet())
+    assert pairs.to_dict("records") == [
+        {"員工": "小明", "上班": "2025-04-01 09:00:00", "下班": "2025-04-01 18:00:00"},
+        {"員工": "小明", "上班": "2025-04-03 09:00:00", "下班": "2025-04-03 20:30:00"},
+        {"員工": "阿華", "上班": "2025-04-02 08:00:00", "下班": "2025-04-02 19:00:00"},
+        {"員工": "小美", "上班": "2025-04-01 22:00:00", "下班": "2025-04-02 07:00:00"},
+    ]
+
+
+def test_segment_employee_blocks_closes_a_block_without_總時數():
+    _, block_index = segment_employee_blocks(time_record_sheet()[LABEL_COLUMN])
+    assert block_index == {"小明": range(0, 7), "阿華": range(7, 11), "小美": range(11, 15)}
+
+
+def salary_table(names):
+    return pd.DataFrame({"綽號": names, "月薪": [30000.0] * len(names), "平均薪資": [125.0] * len(names)})
+
+
+def assert_same_payroll(actual, expected):
+    actual_records, actual_messages = actual
+    expected_records, expected_messages = expected
+    assert list(actual_records) == list(expected_records)
+    for name, record in expected_records.items():
+        pd.testing.assert_frame_equal(actual_records[name], record, check_exact=True)
+    assert actual_messages == expected_messages
+
+
+def test_process_pool_matches_the_serial_result():
+    df, df_salary = make_time_records(12, days=5)
+    # One employee without salary data, so the messages are compared too
+    df_salary = df_salary[df_salary["綽號"] != "員工3"]
+    serial = compute_payroll(df, df_salary)
+    assert_same_payroll(compute_payroll(df, df_salary, workers=2, chunk_size=3), serial)
+    assert any("員工3" in message for _, message in serial[1])
+
+
+def test_stream_with_small_chunks_matches_compute_payroll(tmp_path):
+    df = pd.concat([make_time_records(6, days=4)[0], time_record_sheet()], ignore_index=True)
+    df_salary = salary_table([f"員工{e}" for e in range(6)] + ["小明", "阿華"])
+    path = tmp_path / "time_records.xlsx"
+    df.to_excel(path, index=False)
+
+    expected = compute_payroll(pd.read_excel(path), df_salary)
+    records, messages = {}, []
+    for chunk_records, chunk_messages, _ in compute_payroll_stream(path, df_salary, chunk_rows=7):
+        records.update(chunk_records)
+        messages.extend(chunk_messages)
+    assert_same_payroll((records, messages), expected)
+    assert len(records) == 8
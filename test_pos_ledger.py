@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pandas as pd
+
+from pos_engine import build_pos_ledger
+from pos_ledger import PosLedger
+
+
+def subtotals(*rows):
+    return pd.DataFrame(
+        {"日期": [datetime(2024, 1, day) for day, _ in rows], "金額": [amount for _, amount in rows]}
+    )
+
+
+def test_same_day_subtotals_add_up_like_the_converter(tmp_path):
+    frame = subtotals((1, 100), (1, 50), (2, 200))
+    ledger = PosLedger(str(tmp_path / "ledger.sqlite3"))
+
+    assert ledger.append(frame, source="pos.xlsx") == (2, 0)
+    stored = ledger.to_frame()
+    assert stored["金額"].tolist() == [150.0, 200.0]
+    assert stored["累積營收/現金"].tolist() == [150.0, 350.0]
+    assert stored["累積營收/現金"].iloc[-1] == build_pos_ledger(frame)["累積營收/現金"].iloc[-1]
+
+
+def test_append_continues_the_running_total(tmp_path):
+    ledger = PosLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.append(subtotals((1, 100), (2, 200)))
+
+    assert ledger.append(subtotals((2, 999), (3, 50), (3, 25))) == (1, 1)
+    stored = ledger.to_frame()
+    assert stored["時間"].tolist() == ["2024/1/1", "2024/1/2", "2024/1/3"]
+    assert stored["累積營收/現金"].tolist() == [100.0, 300.0, 375.0]
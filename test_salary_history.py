@@ -0,0 +1,157 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from payroll_engine import build_employee_record
+from salary_history import DAYS_COLLECTION, MONTHS_COLLECTION, save_salary_history
+
+
+class FakeReference:
+    def __init__(self, store, collection, document_id):
+        self.store = store
+        self.collection = collection
+        self.id = document_id
+
+
+class FakeQuery:
+    def __init__(self, store, collection, filters=()):
+        self.store = store
+        self.collection = collection
+        self.filters = filters
+
+    def where(self, filter):
+        return FakeQuery(self.store, self.collection, self.filters + (filter,))
+
+    def select(self, fields):
+        return self
+
+    def get(self):
+        snapshots = []
+        for document_id, data in self.store.get(self.collection, {}).items():
+            if all(data.get(f.field_path) == f.value for f in self.filters):
+                snapshots.append(SimpleNamespace(
+                    id=document_id,
+                    reference=FakeReference(self.store, self.collection, document_id),
+                    to_dict=lambda data=data: dict(data),
+                ))
+        return snapshots
+
+    def document(self, document_id):
+        return FakeReference(self.store, self.collection, document_id)
+
+
+class FakeBatch:
+    def __init__(self, store):
+        self.store = store
+        self.operations = []
+
+    def set(self, ref, data):
+        self.operations.append(lambda: self.store.setdefault(ref.collection, {}).__setitem__(ref.id, dict(data)))
+
+    def delete(self, ref):
+        self.operations.append(lambda: self.store.get(ref.collection, {}).pop(ref.id, None))
+
+    def commit(self):
+        for operation in self.operations:
+            operation()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.store = {}
+
+    def collection(self, name):
+        return FakeQuery(self.store, name)
+
+    def batch(self):
+        return FakeBatch(self.store)
+
+
+def shifts(*days, hours=8.0):
+    """Typed payroll record of one employee with one shift on each day of January 2024."""
+    dates = [datetime(2024, 1, day) for day in days]
+    clock_ins = [date.replace(hour=9) for date in dates]
+    clock_outs = [datetime(2024, 1, day, 9 + int(hours)) for day in days]
+    return build_employee_record(dates, clock_ins, clock_outs, [hours] * len(days),
+                                 ["OK"] * len(days), 30000.0, 125.0)
+
+
+def rollup(db, nickname="小明", month="2024-01"):
+    return db.store[MONTHS_COLLECTION][f"{nickname}_{month}"]
+
+
+def test_saving_another_store_keeps_the_first_stores_days():
+    db = FakeFirestore()
+    save_salary_history(db, {"小明": shifts(1, 2)}, source="store_a.xlsx")
+    save_salary_history(db, {"小明": shifts(3)}, source="store_b.xlsx")
+
+    stored = db.store[DAYS_COLLECTION].values()
+    assert sorted((day["Date"], day["Source"]) for day in stored) == [
+        ("2024-01-01", "store_a.xlsx"), ("2024-01-02", "store_a.xlsx"), ("2024-01-03", "store_b.xlsx"),
+    ]
+    assert rollup(db)["Work_Days"] == 3
+    assert rollup(db)["Shifts"] == 3
+    assert rollup(db)["Hours"] == 24.0
+
+
+def test_resaving_a_file_replaces_only_its_own_days():
+    db = FakeFirestore()
+    save_salary_history(db, {"小明": shifts(1, 2)}, source="store_a.xlsx")
+    save_salary_history(db, {"小明": shifts(2, hours=4.0)}, source="store_b.xlsx")
+    save_salary_history(db, {"小明": shifts(1)}, source="store_a.xlsx")
+
+    stored = db.store[DAYS_COLLECTION].values()
+    assert sorted((day["Date"], day["Source"]) for day in stored) == [
+        ("2024-01-01", "store_a.xlsx"), ("2024-01-02", "store_b.xlsx"),
+    ]
+    assert rollup(db)["Work_Days"] == 2
+
+
+def test_one_day_at_two_stores_counts_once():
+    db = FakeFirestore()
+    save_salary_history(db, {"小明": shifts(5, hours=4.0)}, source="store_a.xlsx")
+    save_salary_history(db, {"小明": shifts(5, hours=5.0)}, source="store_b.xlsx")
+
+    assert len(db.store[DAYS_COLLECTION]) == 2
+    assert rollup(db)["Work_Days"] == 1
+    assert rollup(db)["Shifts"] == 2
+    assert rollup(db)["Hours"] == 9.0
+
+
+def test_same_shifts_under_another_label_are_refused():
+    db = FakeFirestore()
+    save_salary_history(db, {"小明": shifts(1, 2)}, source="本店")
+    with pytest.raises(ValueError, match="本店"):
+        save_salary_history(db, {"小明": shifts(1, 2)}, source="a (1).xlsx")
+
+    assert len(db.store[DAYS_COLLECTION]) == 2
+    assert rollup(db)["Shifts"] == 2
+    assert rollup(db)["Hours"] == 16.0
+
+
+def test_empty_source_label_is_refused():
+    with pytest.raises(ValueError):
+        save_salary_history(FakeFirestore(), {"小明": shifts(1)}, source="  ")
+
+
+def test_corrected_resave_removes_dropped_employees_and_months():
+    db = FakeFirestore()
+    february = build_employee_record([datetime(2024, 2, 1)], [datetime(2024, 2, 1, 9)],
+                                     [datetime(2024, 2, 1, 17)], [8.0], ["OK"], 30000.0, 125.0)
+    save_salary_history(db, {"小明": pd.concat([shifts(1), february], ignore_index=True),
+                             "阿華": shifts(1, 2)}, source="本店")
+    save_salary_history(db, {"阿華": shifts(2, hours=4.0)}, source="二店")
+    assert set(db.store[MONTHS_COLLECTION]) == {"小明_2024-01", "小明_2024-02", "阿華_2024-01"}
+
+    # The corrected file drops 小明 entirely and 阿華's second day
+    save_salary_history(db, {"阿華": shifts(1)}, source="本店")
+
+    stored = db.store[DAYS_COLLECTION].values()
+    assert sorted((day["Nickname"], day["Date"], day["Source"]) for day in stored) == [
+        ("阿華", "2024-01-01", "本店"), ("阿華", "2024-01-02", "二店"),
+    ]
+    assert set(db.store[MONTHS_COLLECTION]) == {"阿華_2024-01"}
+    assert rollup(db, "阿華")["Work_Days"] == 2
+    assert rollup(db, "阿華")["Hours"] == 12.0
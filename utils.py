@@ -1,10 +1,95 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core import exceptions as google_exceptions
+from google.auth.exceptions import TransportError
 import streamlit as st
 import pandas as pd
 import os
+import threading
+import time
+from employee_index import (get_employee_index, get_running_index, build_employee_frame,
+                            employee_frame_from_documents, EMPLOYEE_FIELDS)
+
+# Seconds a Firestore client is trusted before it is probed again
+FIRESTORE_PROBE_INTERVAL = 60
+
+# Document looked up by the liveness probe; it does not need to exist, but
+# its ID must not be a reserved __*__ name or every probe is rejected
+FIRESTORE_PROBE_DOCUMENT = ("Users", "health_check")
+
+# Errors that mean the client cannot reach Firestore any more; any other
+# error (permissions, bad request) came back from the server, so the
+# client itself is working
+_FIRESTORE_DEAD_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.RetryError,
+    TransportError,
+)
+
+# One Firestore client shared by every session and page of this process
+_firestore_lock = threading.Lock()
+_firestore_state = {"client": None, "checked_at": 0.0, "init_seconds": None}
+
+# Seconds the employee table is served from memory before Employee is read again
+EMPLOYEE_CACHE_TTL = int(os.environ.get("EMPLOYEE_CACHE_TTL", "300"))
+
+# Set EMPLOYEE_REALTIME=1 to keep the employee table in memory with a snapshot listener
+EMPLOYEE_REALTIME = os.environ.get("EMPLOYEE_REALTIME", "") == "1"
+
+# Employee table shared by the payroll and employee pages
+_employee_lock = threading.Lock()
+_employee_cache = {"frame": None, "loaded_at": 0.0}
 
 def initialize_firestore():
+    """
+    Return the process-wide Firestore client, building it on first use.
+
+    The client is reused across reruns, pages and sessions. When it has not
+    been used for FIRESTORE_PROBE_INTERVAL seconds a cheap liveness probe is
+    run first, and a client that fails it is rebuilt.
+    """
+    with _firestore_lock:
+        db = _firestore_state["client"]
+        if db is not None:
+            if time.monotonic() - _firestore_state["checked_at"] < FIRESTORE_PROBE_INTERVAL:
+                return db
+            if _firestore_client_is_alive(db):
+                _firestore_state["checked_at"] = time.monotonic()
+                return db
+            print("Firestore client failed its liveness probe, rebuilding")
+            _firestore_state["client"] = None
+            try:
+                firebase_admin.delete_app(firebase_admin.get_app())
+            except ValueError:
+                pass
+        
+        start = time.perf_counter()
+        db = _build_firestore_client()
+        if db is not None:
+            _firestore_state["client"] = db
+            _firestore_state["checked_at"] = time.monotonic()
+            _firestore_state["init_seconds"] = time.perf_counter() - start
+            print(f"Firestore client initialized in {_firestore_state['init_seconds']:.2f}s")
+        return db
+
+def get_firestore_init_seconds():
+    """Seconds the current Firestore client took to initialize (None before the first init)"""
+    return _firestore_state["init_seconds"]
+
+def _firestore_client_is_alive(db):
+    """Liveness probe: a single lookup of a document that does not need to exist"""
+    collection, document = FIRESTORE_PROBE_DOCUMENT
+    try:
+        db.collection(collection).document(document).get(timeout=5)
+    except _FIRESTORE_DEAD_ERRORS as e:
+        print(f"Firestore liveness probe failed: {e}")
+        return False
+    except Exception as e:
+        print(f"Firestore liveness probe got an error from the server, keeping the client: {e}")
+    return True
+
+def _build_firestore_client():
     """
     Initialize Firestore with improved error handling and logging
     """
@@ -57,47 +142,96 @@ def initialize_firestore():
         st.error(f"⚠️ 無法連接到 Firestore: {e}")
         return None
 
-def get_all_employees(db):
+def get_all_employees(db, max_age=None):
     """
     Fetch all employee data from Firestore Employee collection.
 
+    The table is cached in-process for EMPLOYEE_CACHE_TTL seconds and kept
+    up to date by the cache_employee_* functions after every successful
+    write, so reruns do not re-read the whole collection. With
+    EMPLOYEE_REALTIME a snapshot listener keeps it in memory instead and
+    reads make no round-trip at all; while the listener is down the cached
+    table is used as without it.
+
     Args:
         db: Firestore client instance
+        max_age: Oldest cached table to accept, in seconds (default EMPLOYEE_CACHE_TTL)
 
     Returns:
-        pd.DataFrame: Employee data with columns [綽號, 全名, 月薪, 平均薪資]
+        pd.DataFrame: Employee data with string columns [綽號, 全名] and
+        float64 columns [月薪, 平均薪資]
     """
     if not db:
         return pd.DataFrame()
-        
-    nickname = []
-    employee_name = []
-    employee_salary = []
-    employee_hourly_rate = []
+    
+    if EMPLOYEE_REALTIME:
+        index = get_employee_index(db)
+        if index.is_healthy:
+            return index.to_frame()
+    
+    max_age = EMPLOYEE_CACHE_TTL if max_age is None else max_age
+    with _employee_lock:
+        frame = _employee_cache["frame"]
+        if frame is not None and time.monotonic() - _employee_cache["loaded_at"] < max_age:
+            return frame.copy()
 
     try:
-        for i in db.collection("Employee").stream():
-            nickname.append(i.id)
-            employee_info = i.to_dict()
-            employee_name.append(employee_info.get("Name", ""))
-            employee_salary.append(employee_info.get("Salary", 0))
-            employee_hourly_rate.append(employee_info.get("Hourly_Rate", 0))
-
-        db_employee = pd.DataFrame({
-            "綽號": nickname, 
-            "全名": employee_name, 
-            "月薪": employee_salary, 
-            "平均薪資": employee_hourly_rate
-        })
-        
-        return db_employee
-    
+        db_employee = _fetch_all_employees(db)
     except Exception as e:
         error_msg = f"Error fetching employee data: {e}"
         if hasattr(st, 'error'):
             st.error(error_msg)
         print(error_msg)
         return pd.DataFrame()
+    
+    with _employee_lock:
+        _employee_cache["frame"] = db_employee
+        _employee_cache["loaded_at"] = time.monotonic()
+    return db_employee.copy()
+
+def _fetch_all_employees(db):
+    """Read the Employee collection into the employee table, transferring only EMPLOYEE_FIELDS"""
+    documents = db.collection("Employee").select(EMPLOYEE_FIELDS).get()
+    return employee_frame_from_documents(documents)
+
+def cache_employee_upsert(nickname, employee_data):
+    """
+    Apply a successful add/update of an Employee document to the cached table
+    and to the snapshot listener's index, so the next rerun shows it even
+    before the listener reports the change.
+
+    Args:
+        nickname: Document ID (綽號) of the employee
+        employee_data: Fields written to Firestore (Name, Salary, Hourly_Rate, ...)
+    """
+    index = get_running_index()
+    if index is not None:
+        index.apply_write(nickname, employee_data)
+    fields = {"Name": "全名", "Salary": "月薪", "Hourly_Rate": "平均薪資"}
+    values = {column: employee_data[field] for field, column in fields.items() if field in employee_data}
+    with _employee_lock:
+        frame = _employee_cache["frame"]
+        if frame is None:
+            return
+        mask = frame["綽號"] == nickname
+        if mask.any():
+            for column, value in values.items():
+                frame.loc[mask, column] = value
+        else:
+            new_row = build_employee_frame(
+                [nickname], [values.get("全名", "")], [values.get("月薪", 0)], [values.get("平均薪資", 0)]
+            )
+            _employee_cache["frame"] = pd.concat([frame, new_row], ignore_index=True)
+
+def cache_employee_remove(nickname):
+    """Apply a successful delete of an Employee document to the cached table and the listener's index"""
+    index = get_running_index()
+    if index is not None:
+        index.apply_remove(nickname)
+    with _employee_lock:
+        frame = _employee_cache["frame"]
+        if frame is not None:
+            _employee_cache["frame"] = frame[frame["綽號"] != nickname].reset_index(drop=True)
 
 def calculate_work_time(check_in, check_out):
     """